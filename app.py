@@ -1,14 +1,25 @@
 import streamlit as st
 import pandas as pd
-from fredapi import Fred
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import datetime
-from datetime import timedelta
 import base64
+import hashlib
 import os
-import requests 
+import time
+import logging
+import threading
 import google.generativeai as genai
+from data_engine import (fred_fetchers, bcch_fetchers, SeriesCache, CacheWarmer, ReleaseScheduler, FredMetadata,
+                         estimate_next_release, merge_frames, SeriesSet, FETCH_MAX_WORKERS, FETCH_TIMEOUT)
+from series_store import SeriesStore
+from transforms import apply_units, TransformCache
+from formulas import compile_formula, FormulaError
+from fx import PERIOD_FREQS, PERIOD_LABELS, fx_frame, period_ends, period_changes, range_changes, format_changes
+from history import history_table, format_history_table
+from uploads import UPLOAD_TYPES, UserDataStore, content_hash, parse_upload
+from charts import downsample, scatter_class, recession_bands, recession_shapes, figure_key, figure_nbytes, FIGURE_CACHE_ENTRIES, FIGURE_CACHE_MB
+import async_engine
 
 # --- 1. CONFIGURACIÓN VISUAL ---
 st.set_page_config(layout="wide", page_title="XTB Research Macro Dashboard")
@@ -174,6 +185,15 @@ INDICATOR_CONFIG = {
     },
 }
 
+# Sombreado de recesiones: indicador 0/1 por país. Chile solo si se configura un equivalente
+# (XTB_CL_RECESSION_SERIES, id FRED como CHLRECM); sin él, las series chilenas van sin sombreado
+RECESSION_CONFIG = {
+    "US": {"id": "USREC", "src": "fred", "units": "lin", "meta": {"frequency": "Monthly", "title": "NBER Recession Indicator"}},
+}
+if os.environ.get("XTB_CL_RECESSION_SERIES"):
+    RECESSION_CONFIG["CL"] = {"id": os.environ["XTB_CL_RECESSION_SERIES"], "src": "fred", "units": "lin",
+                              "meta": {"frequency": "Monthly", "title": "Recession Indicator for Chile"}}
+
 # --- 3. UTILIDADES ---
 def get_local_logo_base64():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -207,73 +227,9 @@ def get_format_settings(indicator_name):
     if is_pct: return "%", ".2f"
     else: return "", ",.2f"
 
-def estimate_next_release(last_date, frequency):
-    """Estima la próxima fecha de publicación basada en la frecuencia (fallback)"""
-    if frequency in ["Monthly", "Mensual"]:
-        next_month = last_date + timedelta(days=35)
-        return next_month.replace(day=15)
-    elif frequency in ["Weekly", "Semanal"]:
-        return last_date + timedelta(days=7)
-    elif frequency in ["Daily", "Diaria"]:
-        return last_date + timedelta(days=1)
-    elif frequency in ["Quarterly", "Trimestral"]:
-        return last_date + timedelta(days=95)
-    return last_date + timedelta(days=30)
-
-@st.cache_data(ttl=3600)
-def get_fred_release_date(series_id, api_key):
-    """Obtiene la próxima fecha de publicación real desde FRED API"""
-    if not api_key or not series_id:
-        return None
-    try:
-        url = f"https://api.stlouisfed.org/fred/series/release?series_id={series_id}&api_key={api_key}&file_type=json"
-        res = requests.get(url, timeout=10)
-        if res.status_code == 200:
-            data = res.json()
-            if 'releases' in data and len(data['releases']) > 0:
-                release_id = data['releases'][0]['id']
-                # Obtener próximas fechas de release
-                url_dates = f"https://api.stlouisfed.org/fred/release/dates?release_id={release_id}&api_key={api_key}&file_type=json&include_release_dates_with_no_data=true"
-                res_dates = requests.get(url_dates, timeout=10)
-                if res_dates.status_code == 200:
-                    dates_data = res_dates.json()
-                    if 'release_dates' in dates_data:
-                        today = datetime.datetime.now().date()
-                        for rd in dates_data['release_dates']:
-                            release_date = datetime.datetime.strptime(rd['date'], "%Y-%m-%d").date()
-                            if release_date >= today:
-                                return release_date
-    except:
-        pass
-    return None
-
-@st.cache_data(ttl=3600)
-def get_fred_last_updated(series_id, api_key):
-    """Obtiene la fecha de última actualización real desde FRED API"""
-    if not api_key or not series_id:
-        return None
-    try:
-        url = f"https://api.stlouisfed.org/fred/series?series_id={series_id}&api_key={api_key}&file_type=json"
-        res = requests.get(url, timeout=10)
-        if res.status_code == 200:
-            data = res.json()
-            if 'seriess' in data and len(data['seriess']) > 0:
-                last_updated_str = data['seriess'][0].get('last_updated', '')
-                if last_updated_str:
-                    # Formato: "2025-12-16 08:19:00-06"
-                    date_part = last_updated_str.split(' ')[0]
-                    return datetime.datetime.strptime(date_part, "%Y-%m-%d").date()
-    except:
-        pass
-    return None
-
-def render_metadata_panel(indicator_name, df, config, fred_api_key=None):
+def render_metadata_panel(indicator_name, series, config, fred_api_key=None):
     """Renderiza el panel de metadatos estilo FRED y retorna el rango de fechas seleccionado"""
-    if indicator_name not in df.columns:
-        return None, None
-    
-    series = df[indicator_name].dropna()
-    if series.empty:
+    if series is None or series.empty:
         return None, None
     
     # Obtener datos
@@ -318,9 +274,10 @@ def render_metadata_panel(indicator_name, df, config, fred_api_key=None):
     else:
         obs_label = f"{last_date.strftime('%Y-%m-%d')}: <b>{formatted_value}</b>"
     
-    # Obtener Updated date
+    # Obtener Updated date (solo metadatos en memoria, sin red; si aún no llegan se usa la última observación)
+    fred_meta = get_fred_metadata()
     if source == "fred" and fred_api_key:
-        real_updated = get_fred_last_updated(indicator_code, fred_api_key)
+        real_updated = fred_meta.last_updated(indicator_code)
         if real_updated:
             updated_date = real_updated.strftime("%b %d, %Y")
         else:
@@ -330,7 +287,7 @@ def render_metadata_panel(indicator_name, df, config, fred_api_key=None):
     
     # Obtener Next Release
     if source == "fred" and fred_api_key:
-        real_next_release = get_fred_release_date(indicator_code, fred_api_key)
+        real_next_release = fred_meta.next_release(indicator_code)
         if real_next_release:
             next_release_str = real_next_release.strftime("%b %d, %Y")
         else:
@@ -416,66 +373,141 @@ def render_metadata_panel(indicator_name, df, config, fred_api_key=None):
 
 
 # --- 4. MOTOR DE DATOS ---
-@st.cache_data(ttl=3600)
-def get_fred_data(api_key):
-    start_date = "1948-01-01" 
-    df = pd.DataFrame()
-    if not api_key: return df
+@st.cache_resource
+def get_series_store():
+    """Almacén local compartido por todas las sesiones del proceso"""
+    return SeriesStore()
+
+@st.cache_resource
+def get_series_cache():
+    """Caché por serie compartido por todas las sesiones; cada entrada vence en su próxima publicación"""
+    return SeriesCache()
+
+@st.cache_resource
+def get_fred_metadata():
+    """Metadatos FRED (last_updated, calendario por release_id) compartidos por todas las sesiones"""
+    return FredMetadata()
+
+@st.cache_resource
+def get_transform_cache():
+    """Series transformadas compartidas por todas las sesiones (LRU por serie, versión y parámetros)"""
+    return TransformCache()
+
+@st.cache_resource
+def get_figure_cache():
+    """Figuras ya armadas, por versiones de datos, rango y formato: un rerun sin cambios no rehace el gráfico"""
+    return TransformCache(FIGURE_CACHE_ENTRIES, FIGURE_CACHE_MB, sizeof=figure_nbytes)
+
+@st.cache_resource
+def get_user_store():
+    """Archivos propios compartidos por todas las sesiones (una copia por contenido); las sesiones guardan solo handles"""
+    return UserDataStore()
+
+@st.cache_resource
+def get_release_scheduler():
+    """Tabla de próximas publicaciones que decide cuándo se vuelve a descargar cada serie"""
+    return ReleaseScheduler(get_fred_metadata())
+
+# Precalentador: hilo de fondo que renueva las series antes de que venzan (XTB_CACHE_WARMER=0 lo apaga)
+CACHE_WARMER = os.environ.get("XTB_CACHE_WARMER", "1") != "0"
+
+@st.cache_resource
+def get_cache_warmer():
+    """Hilo único del proceso; con él activo, los reruns solo descargan series que nunca se cargaron"""
+    warmer_log = logging.getLogger("data_engine")
+    if not warmer_log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        warmer_log.addHandler(handler)
+        warmer_log.setLevel(os.environ.get("XTB_LOG_LEVEL", "INFO"))
+    warmer = CacheWarmer(get_series_cache())
+    return warmer.start() if CACHE_WARMER else warmer
+
+# Motor de descarga: "threads" (data_engine) o "async" (async_engine, requiere aiohttp)
+INGEST_ENGINE = os.environ.get("XTB_INGEST_ENGINE", "threads")
+
+def run_async_ingest(tasks):
+    """Corre el lote async en segundo plano; si Streamlit interrumpe el script (cambió un input) se cancela"""
+    cancel = threading.Event()
+    future = async_engine.submit_batch(tasks, cancel=cancel)
+    status = st.empty()
     try:
-        fred = Fred(api_key=api_key)
-        fred_indicators = {k: v for k, v in INDICATOR_CONFIG.items() if v.get("src") == "fred"}
-        for name, config in fred_indicators.items():
-            try:
-                units = config.get("units", "lin")
-                series = fred.get_series(config["id"], observation_start=start_date, units=units)
-                temp = series.to_frame(name=name)
-                if df.empty: df = temp
-                else: df = df.join(temp, how='outer')
-            except: continue
-    except: pass
-    return df
-
-@st.cache_data(ttl=3600)
-def get_bcch_data(user, password):
-    if not user or not password: return pd.DataFrame()
-    df_bcch = pd.DataFrame()
-    yr_start = "2000" 
-    yr_end = str(datetime.datetime.now().year)
-    
-    bcch_indicators = {k: v for k, v in INDICATOR_CONFIG.items() if v.get("src") == "bcch"}
-    
-    for name, config in bcch_indicators.items():
-        codes = config.get("ids", [])
-        for code in codes:
-            try:
-                url = f"https://si3.bcentral.cl/SieteRestWS/SieteRestWS.ashx?user={user}&pass={password}&firstdate={yr_start}-01-01&lastdate={yr_end}-12-31&timeseries={code}&function=GetSeries"
-                res = requests.get(url, timeout=10)
-                
-                if res.status_code == 200:
-                    data = res.json()
-                    if 'Series' in data and 'Obs' in data['Series']:
-                        obs = data['Series']['Obs']
-                        if obs:
-                            temp = pd.DataFrame(obs)
-                            temp['indexDateString'] = pd.to_datetime(temp['indexDateString'], dayfirst=True, errors='coerce')
-                            temp['value'] = temp['value'].astype(str).str.replace(',', '.', regex=False)
-                            temp['value'] = pd.to_numeric(temp['value'], errors='coerce')
-                            temp = temp.dropna().set_index('indexDateString')[['value']].rename(columns={'value': name})
-                            
-                            if config.get("calc_yoy_if_index", False) and "IND" in code:
-                                temp = temp.pct_change(12) * 100
-                                temp = temp.dropna()
-
-                            temp = temp[~temp.index.duplicated(keep='last')]
-                            
-                            if df_bcch.empty: df_bcch = temp
-                            else: df_bcch = df_bcch.join(temp, how='outer')
-                            break 
-            except: continue
-    return df_bcch
+        while not future.done():
+            status.caption(f"⏳ Descargando {len(tasks)} series...")
+            time.sleep(0.1)
+        return future.result()
+    finally:
+        cancel.set()
+        status.empty()
+
+def refresh_series(source, fetchers, async_fetchers, max_workers, timeout):
+    """Registra la fuente en el precalentador y descarga lo que falte con el motor configurado"""
+    runner = warm_runner = None
+    if INGEST_ENGINE == "async" and async_engine.available():
+        fetchers = async_engine.with_async_fetch(fetchers, async_fetchers)
+        runner, warm_runner = run_async_ingest, async_engine.run_batch
+    warmer = get_cache_warmer()
+    warmer.register(source, fetchers, runner=warm_runner, max_workers=max_workers, timeout=timeout)
+    get_series_cache().refresh(fetchers, max_workers=max_workers, timeout=timeout, runner=runner, cold_only=warmer.running)
+
+def get_fred_data(api_key, names=None, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+    """Series FRED (todas o solo 'names') desde el caché por serie; solo se descargan las vencidas. Retorna (SeriesSet, errores por serie)"""
+    fred_indicators = {k: v for k, v in INDICATOR_CONFIG.items() if v.get("src") == "fred" and (names is None or k in names)}
+    if not api_key or not fred_indicators: return SeriesSet(), {}
+    store = get_series_store()
+    refresh_series("fred", fred_fetchers(api_key, fred_indicators, store=store, scheduler=get_release_scheduler()),
+                   async_engine.fred_fetchers(api_key, fred_indicators, store), max_workers, timeout)
+    # Los metadatos los renueva el precalentador (sin él, un hilo aparte): la interfaz solo lee memoria
+    series_ids = [c["id"] for c in fred_indicators.values()]
+    warmer = get_cache_warmer()
+    warmer.register_metadata(get_fred_metadata(), series_ids, api_key, max_workers=max_workers, timeout=timeout)
+    if not warmer.running:
+        get_fred_metadata().prefetch_in_background(series_ids, api_key, max_workers=max_workers, timeout=timeout)
+    cache = get_series_cache()
+    return cache.series_set(fred_indicators), cache.errors(fred_indicators)
+
+def get_bcch_data(user, password, names=None, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+    """Indicadores BCCh (todos o solo 'names') desde el caché por serie; solo se descargan los vencidos. Retorna (SeriesSet, errores por serie)"""
+    bcch_indicators = {k: v for k, v in INDICATOR_CONFIG.items() if v.get("src") == "bcch" and (names is None or k in names)}
+    if not user or not password or not bcch_indicators: return SeriesSet(), {}
+    store = get_series_store()
+    refresh_series("bcch", bcch_fetchers(user, password, bcch_indicators, store=store, scheduler=get_release_scheduler()),
+                   async_engine.bcch_fetchers(user, password, bcch_indicators, store), max_workers, timeout)
+    cache = get_series_cache()
+    return cache.series_set(bcch_indicators), cache.errors(bcch_indicators)
+
+# Carga diferida: cada render pide solo las series que usa (XTB_LAZY_LOAD=0 vuelve a cargar todo el catálogo)
+LAZY_LOAD = os.environ.get("XTB_LAZY_LOAD", "1") != "0"
+DOLLAR_CALC_SERIES = ("CL Dólar Observado", "CL UF")
+
+def required_indicators(y1, y2=None, extra=()):
+    """Indicadores del catálogo que necesita el render: las series elegidas (y las de sus fórmulas) y, si se grafica el dólar, las de la calculadora"""
+    if not LAZY_LOAD: return None
+    names = {s for s in (y1, y2, *extra) if s in INDICATOR_CONFIG}
+    if y1 and "Dólar" in y1: names.update(DOLLAR_CALC_SERIES)
+    return names
+
+def recession_region(name):
+    """País cuyas recesiones se sombrean: Chile para series BCCh o 'CL ...', EE.UU. para el resto"""
+    return "CL" if INDICATOR_CONFIG.get(name, {}).get("src") == "bcch" or name.startswith("CL ") else "US"
+
+def get_recession_bands(api_key, region):
+    """Tramos de recesión del país desde su indicador FRED (en el caché por serie). Retorna (tramos, token de versión)"""
+    config = RECESSION_CONFIG.get(region)
+    if not api_key or config is None: return (), None
+    name = f"Recesiones {region}"
+    indicators = {name: config}
+    store = get_series_store()
+    refresh_series("fred", fred_fetchers(api_key, indicators, store=store, scheduler=get_release_scheduler()),
+                   async_engine.fred_fetchers(api_key, indicators, store), FETCH_MAX_WORKERS, FETCH_TIMEOUT)
+    rec_data = get_series_cache().series_set(indicators)
+    if name not in rec_data: return (), None
+    # Los tramos se calculan una vez por versión del indicador
+    token = rec_data.token(name)
+    return get_transform_cache().get(("recessions",) + tuple(token), lambda: recession_bands(rec_data[name])), token
 
 # --- 5. FÁBRICA DE GRÁFICOS ---
-def create_pro_chart(df, col1, col2=None, invert_y2=False, logo_data="", config_format=None, custom_source_label="Proprietary Data", custom_line=None):
+def create_pro_chart(df, col1, col2=None, invert_y2=False, logo_data="", config_format=None, custom_source_label="Proprietary Data", custom_line=None, recessions=()):
     if config_format is None:
         config_format = {"color": "#002b49", "width": 3, "type": "Línea", "rec": True, "color_l2": "#5ca6e5", "width_l2": 3, "dash_l2": "dash"}
 
@@ -506,7 +538,7 @@ def create_pro_chart(df, col1, col2=None, invert_y2=False, logo_data="", config_
     
     hoy_real = datetime.datetime.now()
     if not df.empty:
-        df = df[df.index <= hoy_real] 
+        df = df.loc[:hoy_real]
     
     fig = make_subplots(specs=[[{"secondary_y": has_secondary or line2_yaxis == "Right"}]])
     hover_fmt = "%{x|%A, %b %d, %Y}"
@@ -532,18 +564,21 @@ def create_pro_chart(df, col1, col2=None, invert_y2=False, logo_data="", config_
             
             hovertemplate1 = f"<b>{col1}</b><br>{hover_fmt}: %{{y:,.2f}}{suffix1}<extra></extra>" if show_tooltip else None
             
+            # Líneas y áreas se envían a la resolución del gráfico (los picos se conservan); con muchos puntos van en WebGL
+            p1 = downsample(s1, chart_width) if config_format["type"] != "Barra" else s1
+            
             if config_format["type"] == "Línea":
-                trace_kwargs = dict(x=s1.index, y=s1, name=col1, line=dict(color=COLOR_Y1, width=WIDTH_Y1, dash=DASH_Y1), mode=mode1, hovertemplate=hovertemplate1)
+                trace_kwargs = dict(x=p1.index, y=p1, name=col1, line=dict(color=COLOR_Y1, width=WIDTH_Y1, dash=DASH_Y1), mode=mode1, hovertemplate=hovertemplate1)
                 if marker1:
                     trace_kwargs['marker'] = marker1
-                fig.add_trace(go.Scatter(**trace_kwargs), secondary_y=(line1_yaxis == "Right"))
+                fig.add_trace(scatter_class(len(s1))(**trace_kwargs), secondary_y=(line1_yaxis == "Right"))
             elif config_format["type"] == "Barra":
                 fig.add_trace(go.Bar(x=s1.index, y=s1, name=col1, marker=dict(color=COLOR_Y1), hovertemplate=hovertemplate1), secondary_y=(line1_yaxis == "Right"))
             elif config_format["type"] == "Área":
-                trace_kwargs = dict(x=s1.index, y=s1, name=col1, line=dict(color=COLOR_Y1, width=WIDTH_Y1, dash=DASH_Y1), fill='tozeroy', mode=mode1, hovertemplate=hovertemplate1)
+                trace_kwargs = dict(x=p1.index, y=p1, name=col1, line=dict(color=COLOR_Y1, width=WIDTH_Y1, dash=DASH_Y1), fill='tozeroy', mode=mode1, hovertemplate=hovertemplate1)
                 if marker1:
                     trace_kwargs['marker'] = marker1
-                fig.add_trace(go.Scatter(**trace_kwargs), secondary_y=(line1_yaxis == "Right"))
+                fig.add_trace(scatter_class(len(s1))(**trace_kwargs), secondary_y=(line1_yaxis == "Right"))
             
             txt_val = f"{last_v1:,.2f}{suffix1}" if suffix1 == "%" else f"{last_v1:,.2f}"
             fig.add_annotation(x=s1.index[-1], y=last_v1, text=f" {txt_val}", xref="x", yref="y1", xanchor="left", showarrow=False, font=dict(color="white", size=11, weight="bold"), bgcolor=COLOR_Y1, borderpad=4, opacity=0.9)
@@ -570,10 +605,11 @@ def create_pro_chart(df, col1, col2=None, invert_y2=False, logo_data="", config_
                 
                 hovertemplate2 = f"<b>{col2}</b><br>{hover_fmt}: %{{y:,.2f}}{suffix2}<extra></extra>" if show_tooltip else None
                 
-                trace_kwargs2 = dict(x=s2.index, y=s2, name=col2, line=dict(color=COLOR_Y2, width=WIDTH_Y2, dash=DASH_Y2), mode=mode2, hovertemplate=hovertemplate2)
+                p2 = downsample(s2, chart_width)
+                trace_kwargs2 = dict(x=p2.index, y=p2, name=col2, line=dict(color=COLOR_Y2, width=WIDTH_Y2, dash=DASH_Y2), mode=mode2, hovertemplate=hovertemplate2)
                 if marker2:
                     trace_kwargs2['marker'] = marker2
-                fig.add_trace(go.Scatter(**trace_kwargs2), secondary_y=(line2_yaxis == "Right"))
+                fig.add_trace(scatter_class(len(s2))(**trace_kwargs2), secondary_y=(line2_yaxis == "Right"))
                 
                 txt_val2 = f"{last_v2:,.2f}{suffix2}" if suffix2 == "%" else f"{last_v2:,.2f}"
                 yref2 = "y2" if line2_yaxis == "Right" else "y1"
@@ -631,28 +667,9 @@ def create_pro_chart(df, col1, col2=None, invert_y2=False, logo_data="", config_
             y2_title = ""
         fig.update_yaxes(title=y2_title, title_font=dict(color=COLOR_Y2), showgrid=False, tickfont=dict(color=COLOR_Y2), ticksuffix=suffix2, tickformat=fmt2, autorange="reversed" if invert_y2 else True, secondary_y=True)
 
-    if config_format["rec"]:
-        recessions = [
-            ("1948-11-01", "1949-10-01"),
-            ("1953-07-01", "1954-05-01"),
-            ("1957-08-01", "1958-04-01"),
-            ("1960-04-01", "1961-02-01"),
-            ("1969-12-01", "1970-11-01"),
-            ("1973-11-01", "1975-03-01"),
-            ("1980-01-01", "1980-07-01"),
-            ("1981-07-01", "1982-11-01"),
-            ("1990-07-01", "1991-03-01"),
-            ("2001-03-01", "2001-11-01"),
-            ("2008-01-01", "2009-06-01"),
-            ("2020-02-01", "2020-04-01")
-        ]
-        for start, end in recessions:
-            try:
-                if pd.Timestamp(end) > first_valid_date:
-                    v_s = max(pd.Timestamp(start), first_valid_date)
-                    v_e = min(pd.Timestamp(end), hoy_real)
-                    fig.add_vrect(x0=v_s, x1=v_e, fillcolor="#e6e6e6", opacity=0.5, layer="below", line_width=0, yref="paper", y0=0, y1=1)
-            except: pass
+    # Recesiones: todos los rectángulos en una sola actualización del layout (cacheados por rango)
+    if config_format["rec"] and recessions:
+        fig.update_layout(shapes=recession_shapes(recessions, first_valid_date, pd.Timestamp(hoy_real).normalize()))
     
     # --- LÍNEA PERSONALIZADA (Create Line) ---
     if custom_line and custom_line.get("enabled", False):
@@ -697,28 +714,32 @@ st.title("XTB Research Macro Dashboard")
 with st.sidebar:
     
     # 1. DATOS PROPIOS
-    with st.expander("📂 Datos Propios (Excel)", expanded=True):
-        uploaded_file = st.file_uploader("Subir archivo .xlsx", type=["xlsx"])
-        if 'user_databases' not in st.session_state: st.session_state['user_databases'] = {}
+    with st.expander("📂 Datos Propios (Excel/CSV/Parquet)", expanded=True):
+        uploaded_file = st.file_uploader("Subir archivo .xlsx, .csv o .parquet", type=list(UPLOAD_TYPES))
+        if 'user_files' not in st.session_state: st.session_state['user_files'] = {}
+        user_store = get_user_store()
         
-        if uploaded_file:
-            file_key = uploaded_file.name
-            if file_key not in st.session_state['user_databases']:
-                try:
-                    uploaded_file.seek(0)
-                    df_temp = pd.read_excel(uploaded_file)
-                    date_col = df_temp.columns[0]
-                    df_temp[date_col] = pd.to_datetime(df_temp[date_col], errors='coerce')
-                    df_temp = df_temp.dropna(subset=[date_col]).set_index(date_col).sort_index()
-                    for c in df_temp.columns: df_temp[c] = pd.to_numeric(df_temp[c], errors='coerce')
-                    df_temp = df_temp.select_dtypes(include=['number'])
-                    st.session_state['user_databases'][file_key] = df_temp
-                    st.success(f"Cargado: {file_key}")
-                except Exception as e: st.error(f"Error: {e}")
+        # Se procesa cada subida una vez; el parseo se comparte entre sesiones por hash del contenido
+        if uploaded_file and st.session_state.get('last_upload_id') != uploaded_file.file_id:
+            st.session_state['last_upload_id'] = uploaded_file.file_id
+            try:
+                file_bytes = uploaded_file.getvalue()
+                handle = user_store.acquire(content_hash(file_bytes), lambda: parse_upload(file_bytes, uploaded_file.name))
+                # Un archivo con el mismo nombre reemplaza al anterior aunque su contenido haya cambiado
+                previous = st.session_state['user_files'].pop(uploaded_file.name, None)
+                if previous: previous.release()
+                st.session_state['user_files'][uploaded_file.name] = handle
+                st.success(f"Cargado: {uploaded_file.name}")
+                st.caption(f"Lectura: {handle.summary()}")
+            except Exception as e: st.error(f"Error: {e}")
         
-        if st.session_state['user_databases']:
+        if st.session_state['user_files']:
+            store_stats = user_store.stats()
+            st.caption(f"Almacén compartido: {store_stats['files']} archivos, {store_stats['mb']} MB en memoria"
+                       + (f", {store_stats['spilled']} en disco" if store_stats['spilled'] else ""))
             if st.button("Limpiar Todo"):
-                st.session_state['user_databases'] = {}
+                for handle in st.session_state['user_files'].values(): handle.release()
+                st.session_state['user_files'] = {}
                 st.rerun()
 
     # 2. CONEXIONES API
@@ -742,27 +763,19 @@ with st.sidebar:
         user_question = st.text_area("Pregunta:", placeholder="¿Qué ves?")
         run_ai = st.button("Analizar")
 
-# --- CARGA DATOS ---
-df_fred = get_fred_data(fred_key)
-df_bcch = get_bcch_data(bcch_user, bcch_pass) 
-
-df_repo = pd.DataFrame()
-if not df_fred.empty: df_repo = df_fred
-if not df_bcch.empty:
-    if df_repo.empty: df_repo = df_bcch
-    else: df_repo = df_repo.join(df_bcch, how='outer')
-
-df_full = df_repo.copy()
+# --- DATOS PROPIOS ---
+user_data = SeriesSet()
 user_cols_list = []
-for filename, df_u in st.session_state['user_databases'].items():
-    df_to_merge = df_u.copy()
-    new_cols = {}
-    for c in df_to_merge.columns:
-        if c in df_full.columns: new_cols[c] = f"{c} ({filename})"
-    if new_cols: df_to_merge.rename(columns=new_cols, inplace=True)
-    if not df_full.empty: df_full = df_full.join(df_to_merge, how='outer').sort_index()
-    else: df_full = df_to_merge
-    user_cols_list.extend(df_to_merge.columns.tolist())
+for filename, handle in st.session_state['user_files'].items():
+    # La sesión guarda solo el handle; las hojas viven una vez en el almacén compartido
+    frames = handle.frames()
+    for sheet, df_u in frames.items():
+        label = f"{filename} - {sheet}" if len(frames) > 1 else filename
+        data_hash = df_u.attrs.get("content_hash")
+        for c in df_u.columns:
+            name = f"{c} ({label})" if c in INDICATOR_CONFIG or c in user_cols_list else c
+            user_data.add(name, df_u[c], token=("user", data_hash, c) if data_hash else None)
+            user_cols_list.append(name)
 
 # --- OPCIONES EXCEL ---
 custom_db_label = "Proprietary Data"
@@ -772,10 +785,11 @@ if user_cols_list:
         custom_db_label = st.text_input("Fuente Pie Pagina:", value="Datos Propios")
         for col in user_cols_list:
             new_n = st.text_input(f"Renombrar {col}:", value=col, key=f"ren_{col}")
-            if new_n != col: df_full = df_full.rename(columns={col: new_n})
+            if new_n != col: user_data = user_data.rename({col: new_n})
 
 # --- CONFIGURACION GRAFICO ---
-all_opts = sorted(list(set(list(INDICATOR_CONFIG.keys()) + list(df_full.columns))))
+# El catálogo sale de INDICATOR_CONFIG: no hace falta descargar nada para armar los selectores
+all_opts = sorted(list(set(list(INDICATOR_CONFIG.keys()) + list(user_data))))
 
 # Opciones de transformación estilo FRED
 UNITS_OPTIONS = {
@@ -809,29 +823,6 @@ AGGREGATION_OPTIONS = {
     "Mínimo": "min"
 }
 
-def apply_units_transformation(series, units_type):
-    """Aplica transformación de unidades a la serie"""
-    import numpy as np
-    if units_type == "lin" or units_type is None:
-        return series
-    elif units_type == "chg":
-        return series.diff()
-    elif units_type == "ch1":
-        return series.diff(12)  # Cambio vs año anterior (asume mensual)
-    elif units_type == "pch":
-        return series.pct_change() * 100
-    elif units_type == "pc1":
-        return series.pct_change(12) * 100  # % cambio vs año anterior
-    elif units_type == "pca":
-        return ((series / series.shift(1)) ** 12 - 1) * 100
-    elif units_type == "cch":
-        return (series / series.shift(1)).apply(lambda x: np.log(x) * 100 if x > 0 else None)
-    elif units_type == "cca":
-        return (series / series.shift(1)).apply(lambda x: np.log(x) * 1200 if x > 0 else None)
-    elif units_type == "log":
-        return series.apply(lambda x: np.log(x) if x > 0 else None)
-    return series
-
 def apply_frequency_transformation(series, freq, agg_method):
     """Aplica transformación de frecuencia a la serie"""
     if freq is None:
@@ -840,15 +831,60 @@ def apply_frequency_transformation(series, freq, agg_method):
     agg_func = agg_method if agg_method else "mean"
     return series.resample(freq).agg(agg_func)
 
-def apply_formula(df, formula, col_name):
-    """Aplica una fórmula personalizada a los datos"""
+FORMULA_HELP = ("a = serie de la línea; b, c = series adicionales. Operadores + - * / ** y funciones "
+                "log, exp, sqrt, abs, diff(x, n), lag(x, n), rolling_mean(x, n), yoy(x). "
+                "Ejemplos: a - b, log(a), rolling_mean(a, 12)")
+
+def formula_editor(line):
+    """Campo de fórmula con selectores para b y c; avisa si no compila. Retorna (fórmula, {variable: serie})"""
+    formula = st.text_input("Fórmula", value="a", key=f"formula_{line}", help=FORMULA_HELP)
+    inputs = {}
+    for col, var in zip(st.columns(2), ("b", "c")):
+        with col:
+            selected = st.selectbox(f"{var} =", options=["Ninguno"] + all_opts, key=f"formula_{var}_{line}")
+        if selected != "Ninguno": inputs[var] = selected
     try:
-        # Reemplazar 'a' con el nombre de la columna
-        safe_formula = formula.replace('a', f'df["{col_name}"]')
-        result = eval(safe_formula)
-        return result
-    except:
-        return df[col_name]
+        missing = compile_formula(formula).variables - {"a", *inputs}
+        if missing: st.caption(f"⚠️ Asigna una serie a: {', '.join(sorted(missing))}")
+    except FormulaError as e:
+        st.caption(f"⚠️ {e}")
+    return formula, inputs
+
+def transform_series(data, name, units, freq, agg, use_formula, formula, inputs=None):
+    """Unidades, frecuencia y fórmula sobre una serie de 'data'. Retorna (serie, clave de caché).
+
+    Sin transformaciones retorna la misma serie, sin copiar. El resultado se memoiza por
+    (token de la serie, unidades, frecuencia, agregación, fórmula y tokens de b, c...):
+    un cambio cosmético no recalcula.
+    """
+    units_code = UNITS_OPTIONS.get(units)
+    freq_code = FREQUENCY_OPTIONS.get(freq)
+    agg_code = AGGREGATION_OPTIONS.get(agg) if freq_code else None
+    formula = formula if use_formula and formula != "a" else None
+    inputs = inputs if formula else {}
+    tokens = [data.token(name)] + [data.token(n) for n in inputs.values()]
+    key = None
+    if all(t is not None for t in tokens):
+        key = (tokens[0], units_code, freq_code, agg_code, formula, tuple(zip(inputs, tokens[1:])))
+
+    def compute():
+        series = data[name]
+        # 1. Aplicar transformación de unidades
+        series = apply_units(series, units_code)
+        
+        # 2. Aplicar transformación de frecuencia
+        if freq_code:
+            series = apply_frequency_transformation(series, freq_code, agg_code)
+        
+        # 3. Aplicar fórmula (a = esta serie ya transformada; b, c = series del catálogo tal cual)
+        if formula:
+            try:
+                series = compile_formula(formula).evaluate({"a": series, **{v: data[n] for v, n in inputs.items() if n in data}})
+            except FormulaError:
+                pass
+        return series
+
+    return get_transform_cache().get(key, compute), key
 
 with st.sidebar:
     st.divider()
@@ -890,14 +926,9 @@ with st.sidebar:
             st.markdown("**Customize Data**")
             use_formula_y1 = st.checkbox("Aplicar fórmula", key="use_formula_y1")
             if use_formula_y1:
-                formula_y1 = st.text_input(
-                    "Fórmula (usa 'a' para la serie)",
-                    value="a",
-                    key="formula_y1",
-                    help="Ejemplos: a*2, a+100, a/1000"
-                )
+                formula_y1, formula_inputs_y1 = formula_editor("y1")
             else:
-                formula_y1 = "a"
+                formula_y1, formula_inputs_y1 = "a", {}
         
         with tab2:
             st.markdown("**Selección de Serie**")
@@ -952,15 +983,11 @@ with st.sidebar:
                 st.markdown("**Customize Data**")
                 use_formula_y2 = st.checkbox("Aplicar fórmula", key="use_formula_y2")
                 if use_formula_y2:
-                    formula_y2 = st.text_input(
-                        "Fórmula (usa 'a' para la serie)",
-                        value="a",
-                        key="formula_y2"
-                    )
+                    formula_y2, formula_inputs_y2 = formula_editor("y2")
                 else:
-                    formula_y2 = "a"
+                    formula_y2, formula_inputs_y2 = "a", {}
             else:
-                units_y2, freq_y2, agg_y2, formula_y2 = "Niveles", "Original", "Promedio", "a"
+                units_y2, freq_y2, agg_y2, formula_y2, formula_inputs_y2 = "Niveles", "Original", "Promedio", "a", {}
         
         with tab3:
             # --- GRAPH TYPE ---
@@ -1065,50 +1092,43 @@ with st.sidebar:
                 "line2_yaxis": line2_yaxis
             }
 
-# --- APLICAR TRANSFORMACIONES ---
-df_transformed = df_full.copy()
+# --- CARGA DATOS ---
+needed = required_indicators(y1_sel, y2_sel, [*formula_inputs_y1.values(), *formula_inputs_y2.values()])
+fred_data, fred_errors = get_fred_data(fred_key, needed)
+bcch_data, bcch_errors = get_bcch_data(bcch_user, bcch_pass, needed)
 
-# Transformar Y1
-if y1_sel in df_transformed.columns:
-    series_y1 = df_transformed[y1_sel].copy()
-    
-    # 1. Aplicar transformación de unidades
-    series_y1 = apply_units_transformation(series_y1, UNITS_OPTIONS.get(units_y1))
-    
-    # 2. Aplicar transformación de frecuencia
-    if freq_y1 != "Original":
-        series_y1 = apply_frequency_transformation(series_y1, FREQUENCY_OPTIONS.get(freq_y1), AGGREGATION_OPTIONS.get(agg_y1))
-    
-    # 3. Aplicar fórmula
-    if use_formula_y1 and formula_y1 != "a":
-        try:
-            temp_df = pd.DataFrame({y1_sel: series_y1})
-            series_y1 = apply_formula(temp_df, formula_y1, y1_sel)
-        except:
-            pass
-    
-    df_transformed[y1_sel] = series_y1
+fetch_errors = {**fred_errors, **bcch_errors}
+if fetch_errors:
+    with st.sidebar.expander(f"⚠️ Series no disponibles ({len(fetch_errors)})", expanded=False):
+        for name, err in fetch_errors.items(): st.caption(f"**{name}**: {err}")
 
-# Transformar Y2
-if y2_sel != "Ninguno" and y2_sel in df_transformed.columns:
-    series_y2 = df_transformed[y2_sel].copy()
-    
-    series_y2 = apply_units_transformation(series_y2, UNITS_OPTIONS.get(units_y2))
-    
-    if freq_y2 != "Original":
-        series_y2 = apply_frequency_transformation(series_y2, FREQUENCY_OPTIONS.get(freq_y2), AGGREGATION_OPTIONS.get(agg_y2))
-    
-    if use_formula_y2 and formula_y2 != "a":
-        try:
-            temp_df = pd.DataFrame({y2_sel: series_y2})
-            series_y2 = apply_formula(temp_df, formula_y2, y2_sel)
-        except:
-            pass
-    
-    df_transformed[y2_sel] = series_y2
+release_table = get_release_scheduler().table()
+if not release_table.empty:
+    with st.sidebar.expander("🗓️ Próximas Publicaciones", expanded=False):
+        st.dataframe(release_table.sort_values("next_refresh"), use_container_width=True,
+                     column_config={"next_release": "Publicación", "next_refresh": "Próxima descarga", "basis": "Fuente"})
+        last_cycle = get_cache_warmer().last_cycle
+        if last_cycle:
+            st.caption(f"Último precalentamiento: {datetime.datetime.fromtimestamp(last_cycle['started']):%H:%M:%S}, "
+                       f"{last_cycle['series']} series en {last_cycle['seconds']:.1f}s")
+
+# Cada serie en su índice nativo; solo se alinean las que se grafican juntas
+data = SeriesSet.union(fred_data, bcch_data, user_data)
+
+# --- APLICAR TRANSFORMACIONES ---
+# Solo y1/y2: se parte de las series del caché sin copiarlas y se alinean recién al final
+chart_series, chart_keys = {}, {}
+if y1_sel in data:
+    chart_series[y1_sel], chart_keys[y1_sel] = transform_series(data, y1_sel, units_y1, freq_y1, agg_y1, use_formula_y1, formula_y1, formula_inputs_y1)
+if y2_sel != "Ninguno" and y2_sel in data:
+    chart_series[y2_sel], chart_keys[y2_sel] = transform_series(data, y2_sel, units_y2, freq_y2, agg_y2, use_formula_y2, formula_y2, formula_inputs_y2)
+
+# La alineación del par también se memoiza (los nombres entran en la clave: son las columnas)
+align_key = ("aligned",) + tuple(chart_keys.items()) if chart_keys and all(chart_keys.values()) else None
+df_transformed = get_transform_cache().get(align_key, lambda: merge_frames([s.rename(name) for name, s in chart_series.items()]))
 
 # --- RENDER ---
-if not df_full.empty and y1_sel != "Sin Datos":
+if not data.empty and y1_sel != "Sin Datos":
     
     # IA RESPONSE
     if gemini_key and run_ai:
@@ -1117,8 +1137,8 @@ if not df_full.empty and y1_sel != "Sin Datos":
                 avail = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
                 t_model = next((m for m in avail if 'flash' in m), next((m for m in avail if 'pro' in m), None))
                 if t_model:
-                    if y1_sel in df_full.columns:
-                        d_csv = df_full[[y1_sel]].dropna().tail(30).to_csv()
+                    if y1_sel in data:
+                        d_csv = data[y1_sel].tail(30).to_frame(y1_sel).to_csv()
                         mod = genai.GenerativeModel(t_model)
                         res = mod.generate_content(f"SISTEMA: {system_prompt}\nDATOS: {d_csv}\nPREGUNTA: {user_question}")
                         st.sidebar.info(res.text)
@@ -1128,8 +1148,8 @@ if not df_full.empty and y1_sel != "Sin Datos":
     # === PANEL DE METADATOS ESTILO FRED ===
     date_from, date_to = None, None
     if y1_sel in INDICATOR_CONFIG:
-        date_from, date_to = render_metadata_panel(y1_sel, df_full, INDICATOR_CONFIG[y1_sel], fred_api_key=fred_key)
-    elif y1_sel in df_full.columns:
+        date_from, date_to = render_metadata_panel(y1_sel, data.get(y1_sel), INDICATOR_CONFIG[y1_sel], fred_api_key=fred_key)
+    elif y1_sel in data:
         # Para datos personalizados, crear config básica
         custom_config = {
             "src": "custom",
@@ -1141,12 +1161,13 @@ if not df_full.empty and y1_sel != "Sin Datos":
                 "title": y1_sel
             }
         }
-        date_from, date_to = render_metadata_panel(y1_sel, df_full, custom_config)
+        date_from, date_to = render_metadata_panel(y1_sel, data[y1_sel], custom_config)
     
     # Filtrar datos según el rango de fechas seleccionado
-    df_filtered = df_transformed.copy()
+    # Índice ordenado: el rango es un slice (vista), no una máscara que copia
+    df_filtered = df_transformed
     if date_from and date_to:
-        df_filtered = df_transformed[(df_transformed.index >= pd.Timestamp(date_from)) & (df_transformed.index <= pd.Timestamp(date_to))]
+        df_filtered = df_transformed.loc[pd.Timestamp(date_from):pd.Timestamp(date_to)]
 
     # Preparar línea personalizada si está habilitada
     custom_line_params = None
@@ -1163,7 +1184,13 @@ if not df_full.empty and y1_sel != "Sin Datos":
 
     # CHART
     if y1_sel in df_filtered.columns or (y2_sel != "Ninguno" and y2_sel in df_filtered.columns):
-        fig = create_pro_chart(df_filtered, y1_sel, y2_sel, invert_y2, logo_b64, config_visual, custom_source_label=custom_db_label, custom_line=custom_line_params)
+        recessions, rec_token = get_recession_bands(fred_key, recession_region(y1_sel)) if config_visual["rec"] else ((), None)
+        # La figura depende del día (el eje termina hoy), por eso la fecha entra en la clave
+        fig_key = figure_key(align_key, y1=y1_sel, y2=y2_sel, invert_y2=invert_y2, date_from=date_from, date_to=date_to,
+                             config=config_visual, custom_line=custom_line_params, source_label=custom_db_label,
+                             logo=hashlib.sha256(logo_b64.encode()).hexdigest(), recessions=rec_token, today=datetime.date.today())
+        fig = get_figure_cache().get(fig_key, lambda: create_pro_chart(df_filtered, y1_sel, y2_sel, invert_y2, logo_b64, config_visual,
+                                                                       custom_source_label=custom_db_label, custom_line=custom_line_params, recessions=recessions))
         st.plotly_chart(fig, use_container_width=True, config={'toImageButtonOptions': {'format': 'jpeg', 'filename': 'grafico_xtb', 'scale': 2}})
     else:
         st.info("💡 Los datos están cargando o no están disponibles. Verifique sus claves.")
@@ -1176,116 +1203,65 @@ if not df_full.empty and y1_sel != "Sin Datos":
     is_macro = (meta.get("type") == "macro") or is_excel
     
     # --- CALCULADORA DE VARIACIONES (CON OVERRIDE MANUAL) ---
-    if "Dólar" in y1_sel and "CL Dólar Observado" in df_full.columns:
+    if "Dólar" in y1_sel and "CL Dólar Observado" in data:
         st.subheader("🧮 Calculadora de Variaciones: Dólar")
         
-        # 1. Crear copia para trabajar
-        df_dollar_calc = df_full[["CL Dólar Observado"]].dropna().copy()
-        
-        # 2. APLICAR DATO MANUAL SI EXISTE
-        if manual_usd > 0:
-            today_date = pd.Timestamp.now().normalize()
-            df_dollar_calc.loc[today_date] = manual_usd
-            df_dollar_calc = df_dollar_calc.sort_index()
-        
-        # 3. Unir UF
-        if "CL UF" in df_full.columns:
-            df_uf = df_full[["CL UF"]].copy()
-            if manual_usd > 0:
-                last_uf = df_uf["CL UF"].dropna().iloc[-1]
-                today_date = pd.Timestamp.now().normalize()
-                if today_date not in df_uf.index:
-                    df_uf.loc[today_date] = last_uf
-            
-            df_dollar_calc = df_dollar_calc.join(df_uf, how='left').ffill()
-        
-        available_years = sorted(df_dollar_calc.index.year.unique().tolist(), reverse=True)
-        default_years = [y for y in [2025, 2017, 2009] if y in available_years]
-        if not default_years and available_years: default_years = [available_years[0]]
+        # Dólar con la UF vigente (as-of) y el dato manual; se arma una vez por versión de ambas series
+        has_uf = "CL UF" in data
+        fx_tokens = (data.token("CL Dólar Observado"), data.token("CL UF") if has_uf else None)
+        fx_key = ("fx", fx_tokens, manual_usd, datetime.date.today()) if fx_tokens[0] and (fx_tokens[1] or not has_uf) else None
+        df_dollar_calc = get_transform_cache().get(fx_key, lambda: fx_frame(data["CL Dólar Observado"], data.get("CL UF"), manual=manual_usd))
         
-        target_years = st.multiselect("Selecciona los años a analizar:", options=available_years, default=default_years)
+        fx_mode = st.radio("Períodos:", [*PERIOD_FREQS, "Fechas personalizadas"], horizontal=True, key="fx_mode")
+        if fx_mode in PERIOD_FREQS:
+            fx_freq = PERIOD_FREQS[fx_mode]
+            available_periods = period_ends(df_dollar_calc.index, fx_freq)[0][::-1].astype(str).tolist()
+            if fx_freq == "Y":
+                default_periods = [y for y in ["2025", "2017", "2009"] if y in available_periods] or available_periods[:1]
+            else:
+                default_periods = available_periods[:4 if fx_freq == "Q" else 6]
+            target_periods = sorted(st.multiselect(f"Selecciona los {fx_mode.lower()} a analizar:", options=available_periods,
+                                                   default=default_periods, key=f"fx_periods_{fx_freq}"), reverse=True)
+            fx_label = PERIOD_LABELS[fx_freq]
+            fx_result = get_transform_cache().get(fx_key and fx_key + (fx_freq, tuple(target_periods)),
+                                                  lambda: period_changes(df_dollar_calc, fx_freq, target_periods)) if target_periods else None
+        else:
+            today_ts = pd.Timestamp.now().normalize()
+            pairs_df = st.data_editor(pd.DataFrame({"Desde": [today_ts.replace(month=1, day=1)], "Hasta": [today_ts]}), num_rows="dynamic",
+                                      column_config={"Desde": st.column_config.DateColumn("Desde", format="DD-MM-YYYY"),
+                                                     "Hasta": st.column_config.DateColumn("Hasta", format="DD-MM-YYYY")}, key="fx_pairs")
+            fx_pairs = tuple((pd.Timestamp(a), pd.Timestamp(b)) for a, b in pairs_df.dropna().itertuples(index=False))
+            fx_label = "Período"
+            fx_result = get_transform_cache().get(fx_key and fx_key + ("pairs", fx_pairs),
+                                                  lambda: range_changes(df_dollar_calc, fx_pairs)) if fx_pairs else None
         
-        if target_years:
-            stats = []
-            for yr in sorted(target_years, reverse=True):
-                yr_data = df_dollar_calc[df_dollar_calc.index.year == yr]
-                prev_yr_data = df_dollar_calc[df_dollar_calc.index.year == (yr - 1)]
-                
-                if not yr_data.empty:
-                    current_price = yr_data["CL Dólar Observado"].iloc[-1]
-                    ref_date = yr_data.index[-1].strftime('%d-%m-%Y')
-                    
-                    current_uf = yr_data["CL UF"].iloc[-1] if "CL UF" in yr_data.columns else None
-                    
-                    nom_var = "N/A"
-                    real_var = "N/A"
-                    var_clp = "N/A"
-                    
-                    if not prev_yr_data.empty:
-                        prev_price = prev_yr_data["CL Dólar Observado"].iloc[-1]
-                        prev_uf = prev_yr_data["CL UF"].iloc[-1] if "CL UF" in prev_yr_data.columns else None
-                        
-                        nom_pct = ((current_price - prev_price) / prev_price) * 100
-                        nom_var = f"{nom_pct:.2f}%"
-                        
-                        diff_price = current_price - prev_price
-                        sign = "+" if diff_price > 0 else ""
-                        var_clp = f"{sign}${diff_price:,.2f}"
-                        
-                        if current_uf and prev_uf:
-                            real_pct = (((current_price / current_uf) - (prev_price / prev_uf)) / (prev_price / prev_uf)) * 100
-                            real_var = f"{real_pct:.2f}%"
-                    
-                    stats.append({
-                        "Año": yr,
-                        "Fecha Ref.": ref_date,
-                        "Cierre Nominal": f"${current_price:,.2f}",
-                        "Var. $ (CLP)": var_clp,
-                        "Var. Nominal %": nom_var,
-                        "Var. Real (UF) %": real_var if "CL UF" in df_full.columns else "Requiere UF"
-                    })
-            
-            st.table(pd.DataFrame(stats).set_index("Año"))
+        if fx_result is not None:
+            st.table(format_changes(fx_result, has_uf).rename_axis(fx_label))
         else:
-            st.info("Selecciona al menos un año para ver el cálculo.")
+            st.info("Selecciona al menos un período para ver el cálculo.")
 
     # --- TABLA HISTÓRICA GENERAL ---
-    if is_macro and y1_sel in df_full.columns:
+    if is_macro and y1_sel in data:
         st.subheader(f"📅 Histórico: {y1_sel}")
-        start_dt_table = pd.to_datetime("2020-01-01")
-        df_view = df_full[df_full.index >= start_dt_table].copy()
-        
-        df_cal = df_view[[y1_sel]].dropna().sort_index(ascending=False)
-        df_cal['Anterior'] = df_cal[y1_sel].shift(-1)
-        
-        df_cal.index.name = 'Fecha_Base'
-        df_cal = df_cal.reset_index()
-        
-        df_cal['Mes_Ref'] = df_cal['Fecha_Base'].dt.month
-        df_cal['Referencia'] = df_cal['Mes_Ref'].apply(get_month_name) + " " + df_cal['Fecha_Base'].dt.year.astype(str)
-        df_cal['Fecha_Pub'] = df_cal['Fecha_Base'] + pd.DateOffset(months=1)
-        df_cal['Mes_Pub'] = df_cal['Fecha_Pub'].dt.month
-        df_cal['Publicación (Est.)'] = df_cal['Mes_Pub'].apply(get_month_name) + " " + df_cal['Fecha_Pub'].dt.year.astype(str)
-        
-        df_cal = df_cal.rename(columns={y1_sel: 'Actual'})
+        # Toda la historia de la serie elegida; publicación real desde el calendario FRED en memoria (sin red)
+        release_dates = get_fred_metadata().release_history(meta["id"]) if meta.get("src") == "fred" else []
+        df_cal = history_table(data[y1_sel], release_dates)
         
-        is_pct = meta.get("is_percent", False)
-        def fmt(x): 
-            if pd.isna(x): return ""
-            txt = f"{x:.2f}"
-            if txt.endswith(".00"): txt = txt[:-3]
-            return f"{txt}%" if is_pct else txt
-
-        df_cal['Actual'] = df_cal['Actual'].apply(fmt)
-        df_cal['Anterior'] = df_cal['Anterior'].apply(fmt)
+        col_rows, col_page, _ = st.columns([1, 1, 3])
+        with col_rows:
+            page_size = st.selectbox("Filas por página:", [25, 50, 100, 250], index=1, key="hist_page_size")
+        n_pages = max(1, -(-len(df_cal) // page_size))
+        with col_page:
+            page = st.number_input(f"Página (de {n_pages}):", min_value=1, max_value=n_pages, value=1, step=1, key="hist_page")
+        start_row = (min(page, n_pages) - 1) * page_size
         
         st.dataframe(
-            df_cal[['Referencia', 'Publicación (Est.)', 'Actual', 'Anterior']].dropna(subset=['Anterior']),
+            format_history_table(df_cal, meta.get("is_percent", False), start_row, start_row + page_size),
             hide_index=True, 
             use_container_width=True,
             column_config={
                 "Referencia": st.column_config.TextColumn("Referencia", width="medium"),
-                "Publicación (Est.)": st.column_config.TextColumn("Publicación (Est.)", width="medium"),
+                "Publicación": st.column_config.TextColumn("Publicación", width="medium", help="Fecha real del calendario FRED; (est.) si no se conoce"),
                 "Actual": st.column_config.TextColumn("Dato Actual", width="small"),
                 "Anterior": st.column_config.TextColumn("Dato Anterior", width="small")
             }
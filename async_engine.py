@@ -0,0 +1,218 @@
+"""Motor de ingesta asíncrono (asyncio + aiohttp) para FRED y BCCh.
+
+Alternativa a los hilos de data_engine: un solo event loop con límite de conexiones por host,
+reintentos con backoff y cancelación cooperativa. Produce las mismas series y el mismo
+DataFrame ancho que el motor síncrono, y usa el mismo almacén local para refrescos incrementales.
+Las lecturas y escrituras del almacén (parquet) corren en asyncio.to_thread para no frenar el loop.
+"""
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+
+try:
+    import aiohttp
+except ImportError:  # dependencia opcional: sin aiohttp se usa el motor de hilos
+    aiohttp = None
+
+import http_client
+import data_engine as de
+from series_store import series_key
+
+PER_HOST_LIMIT = int(os.environ.get("XTB_ASYNC_PER_HOST", "10"))
+CANCEL_POLL = 0.05  # segundos entre revisiones del token de cancelación
+
+
+def available():
+    return aiohttp is not None
+
+
+class IngestError(Exception):
+    pass
+
+
+async def get_json(session, url, params, retries=http_client.MAX_RETRIES, read_timeout=None):
+    """GET con los mismos reintentos que http_client (429/5xx y errores de conexión, backoff con jitter).
+
+    'read_timeout' reemplaza el de la sesión (pensado para las series FRED completas) en este pedido.
+    """
+    public_url = http_client.public_url(url)
+    timeout = aiohttp.ClientTimeout(sock_connect=http_client.CONNECT_TIMEOUT, sock_read=read_timeout) if read_timeout else None
+    for attempt in range(retries + 1):
+        retry_after = None
+        try:
+            async with session.get(url, params=params, timeout=timeout) as res:
+                if res.status in http_client.RETRY_STATUS and attempt < retries:
+                    retry_after = res.headers.get("Retry-After")
+                elif res.status >= 400:
+                    raise IngestError(f"HTTP {res.status} {res.reason} en {public_url}")
+                else:
+                    return await res.json(content_type=None)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                raise IngestError(f"{type(e).__name__} en {public_url}") from None
+        await asyncio.sleep(http_client.backoff_delay(attempt, retry_after))
+
+
+# --- FUENTES ---
+async def fetch_fred_series(session, api_key, series_id, units="lin", start_date=de.FRED_START_DATE, store=None):
+    """Equivalente async de data_engine.fetch_fred_series"""
+    key = series_key("fred", series_id, units)
+    stored = await asyncio.to_thread(store.read, key) if store is not None else None
+    params = de.fred_observation_params(series_id, api_key, de.refresh_start(stored, start_date), units)
+    data = await get_json(session, f"{de.FRED_API_URL}/series/observations", params)
+    series = de.upsert_series(stored, de.parse_fred_observations(data.get('observations'), series_id))
+    if store is not None:
+        await asyncio.to_thread(store.write, key, series, source="fred", id=series_id, units=units)
+    return series
+
+
+async def fetch_bcch_code(session, user, password, code, store=None, retries=http_client.MAX_RETRIES):
+    """Equivalente async de data_engine.fetch_bcch_code_incremental (timeout de lectura BCCH_TIMEOUT)"""
+    stored = await asyncio.to_thread(store.read, series_key("bcch", code)) if store is not None else None
+    params = de.bcch_params(user, password, code, de.refresh_start(stored, de.BCCH_START_DATE))
+    data = await get_json(session, de.BCCH_URL, params, retries=retries, read_timeout=de.BCCH_TIMEOUT)
+    fresh = de.bcch_series_from_json(data, code)
+    return await asyncio.to_thread(de.store_bcch_code, code, stored, fresh, store)
+
+
+async def race_codes(fetch, codes, deadline=de.BCCH_RACE_TIMEOUT):
+    """Todos los códigos a la vez; gana el primero de la lista con datos y se cancelan los demás.
+
+    Como data_engine.race_codes: pasado 'deadline' un código que no respondió cuenta como fallido
+    y gana el mejor que ya tenga datos.
+    """
+    if not codes:
+        raise LookupError("Sin códigos configurados")
+    tasks = [asyncio.ensure_future(fetch(code)) for code in codes]
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline
+    failures = []
+    try:
+        for code, task in zip(codes, tasks):
+            if not task.done():
+                await asyncio.wait({task}, timeout=max(0.0, stop_at - loop.time()))
+            if not task.done():
+                failures.append(f"{code}: sin respuesta en {deadline:g}s")
+                continue
+            try:
+                return code, task.result()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+        raise LookupError(" | ".join(failures))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fetch_bcch_indicator(session, user, password, name, config, store=None):
+    """Equivalente async de data_engine.fetch_bcch_indicator (código recordado primero, luego carrera de un intento por código)"""
+    codes = list(config.get("ids", []))
+    fetch = lambda code, retries=http_client.MAX_RETRIES: fetch_bcch_code(session, user, password, code, store, retries)
+    preferred = de.preferred_bcch_code(name)
+    result = None
+    if preferred in codes:
+        try:
+            result = preferred, await fetch(preferred)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            codes.remove(preferred)
+    if result is None:
+        result = await race_codes(lambda code: fetch(code, retries=0), codes)
+        de.remember_bcch_code(name, result[0])
+    code, (series, changed_from) = result
+    return await asyncio.to_thread(de.finish_bcch_indicator, name, config, code, series, changed_from, store)
+
+
+def fred_fetchers(api_key, indicators, store=None):
+    """{nombre: fetch(session)} async para las series FRED del catálogo"""
+    return {name: (lambda session, c=config: fetch_fred_series(session, api_key, c["id"], c.get("units", "lin"), store=store))
+            for name, config in indicators.items()}
+
+
+def bcch_fetchers(user, password, indicators, store=None):
+    """{nombre: fetch(session)} async para los indicadores BCCh del catálogo"""
+    return {name: (lambda session, n=name, c=config: fetch_bcch_indicator(session, user, password, n, c, store))
+            for name, config in indicators.items()}
+
+
+def with_async_fetch(fetchers, async_fetchers):
+    """Reemplaza el fetch de {nombre: (clave, fetch, schedule)} (data_engine) por su versión async"""
+    return {name: (key, async_fetchers[name], schedule) for name, (key, _, schedule) in fetchers.items()}
+
+
+# --- EJECUCIÓN ---
+async def _watch(cancel):
+    while not cancel.is_set():
+        await asyncio.sleep(CANCEL_POLL)
+
+
+async def run_async(tasks, cancel=None, per_host=PER_HOST_LIMIT, timeout=de.FETCH_TIMEOUT):
+    """Corre {nombre: fetch(session)} en un event loop. Retorna (resultados, errores).
+
+    Si 'cancel' (threading.Event) se activa, se cancelan las descargas pendientes; esas series
+    no aparecen ni en resultados ni en errores.
+    """
+    results, errors = {}, {}
+    if not tasks:
+        return results, errors
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=per_host)
+    client_timeout = aiohttp.ClientTimeout(sock_connect=http_client.CONNECT_TIMEOUT, sock_read=de.FRED_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        async def one(name, fetch):
+            try:
+                results[name] = await asyncio.wait_for(fetch(session), timeout)
+            except asyncio.TimeoutError:
+                errors[name] = f"Timeout ({timeout:g}s)"
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+
+        batch = asyncio.gather(*(one(name, fetch) for name, fetch in tasks.items()))
+        if cancel is None:
+            await batch
+            return results, errors
+        watcher = asyncio.ensure_future(_watch(cancel))
+        await asyncio.wait({batch, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        watcher.cancel()
+        if not batch.done():
+            batch.cancel()
+            try:
+                await batch
+            except asyncio.CancelledError:
+                pass
+    return results, errors
+
+
+def run_batch(tasks, cancel=None, per_host=PER_HOST_LIMIT, timeout=de.FETCH_TIMEOUT):
+    """Versión síncrona de run_async (crea su propio event loop)"""
+    return asyncio.run(run_async(tasks, cancel, per_host, timeout))
+
+
+def submit_batch(tasks, cancel=None, per_host=PER_HOST_LIMIT, timeout=de.FETCH_TIMEOUT):
+    """Corre run_batch en un hilo propio y retorna un Future, para que el llamador pueda esperar y cancelar"""
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(run_batch(tasks, cancel, per_host, timeout))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name="async-ingest", daemon=True).start()
+    return future
+
+
+def fetch_catalog(indicators, fred_key=None, bcch_user=None, bcch_pass=None, store=None, cancel=None,
+                  per_host=PER_HOST_LIMIT, timeout=de.FETCH_TIMEOUT):
+    """Descarga todo el catálogo {nombre: config} y retorna (df ancho, errores) como get_fred_data/get_bcch_data"""
+    tasks = {}
+    if fred_key:
+        tasks.update(fred_fetchers(fred_key, {k: v for k, v in indicators.items() if v.get("src") == "fred"}, store))
+    if bcch_user and bcch_pass:
+        tasks.update(bcch_fetchers(bcch_user, bcch_pass, {k: v for k, v in indicators.items() if v.get("src") == "bcch"}, store))
+    results, errors = run_batch(tasks, cancel, per_host, timeout)
+    df = de.merge_frames([results[name].rename(name) for name in indicators if name in results])
+    return df, {name: errors[name] for name in indicators if name in errors}
@@ -0,0 +1,68 @@
+"""Benchmark del gráfico: armado y serialización de la figura con trazos SVG (go.Scatter) vs WebGL (go.Scattergl).
+
+    python benchmarks/bench_chart.py --points 1000 10000 100000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import plotly.graph_objects as go  # noqa: E402
+from plotly.subplots import make_subplots  # noqa: E402
+
+from charts import downsample  # noqa: E402
+
+
+def synthetic_pair(points, seed=0):
+    """Diaria hábil de 'points' observaciones y una mensual sobre el mismo rango"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2026-06-30", periods=points)
+    daily = pd.Series(4 + rng.standard_normal(points).cumsum() * 0.05, index=index, name="DSYN")
+    monthly = daily.resample("MS").last().rename("MSYN")
+    return daily, monthly
+
+
+def build_figure(s1, s2, trace_class):
+    """Misma estructura que create_pro_chart: línea con marcadores, línea punteada en eje secundario y anotaciones"""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(trace_class(x=s1.index, y=s1, name=s1.name, mode="lines+markers", line=dict(color="#002b49", width=3, dash="solid"),
+                              marker=dict(symbol="circle", size=8, color="#002b49")), secondary_y=False)
+    fig.add_trace(trace_class(x=s2.index, y=s2, name=s2.name, mode="lines", line=dict(color="#5ca6e5", width=3, dash="dash")), secondary_y=True)
+    for s, yref in ((s1, "y1"), (s2, "y2")):
+        fig.add_annotation(x=s.index[-1], y=s.iloc[-1], text=f" {s.iloc[-1]:,.2f}", xref="x", yref=yref, xanchor="left", showarrow=False)
+    return fig
+
+
+def best(fn, repeat=5):
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--width", type=int, default=1040, help="ancho del gráfico para la reducción de puntos")
+    args = parser.parse_args()
+
+    print(f"{'puntos':>8} {'reducción':>9} {'trazo':>10} {'enviados':>9} {'armado ms':>10} {'json ms':>8} {'json KB':>8}")
+    for points in args.points:
+        s1, s2 = synthetic_pair(points)
+        for reduce in (False, True):
+            p1, p2 = (downsample(s1, args.width), downsample(s2, args.width)) if reduce else (s1, s2)
+            for trace_class in (go.Scatter, go.Scattergl):
+                build_ms, fig = best(lambda: build_figure(p1, p2, trace_class))
+                json_ms, payload = best(fig.to_json)
+                print(f"{points:>8} {'sí' if reduce else 'no':>9} {trace_class.__name__:>10} {len(p1):>9} "
+                      f"{build_ms:>10.1f} {json_ms:>8.1f} {len(payload) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark de ingesta: motor de hilos (data_engine) vs motor async (async_engine) contra el stub local.
+
+    python benchmarks/bench_ingest.py --series 200 --latency 0.2
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import data_engine as de  # noqa: E402
+import async_engine  # noqa: E402
+
+
+def synthetic_catalog(n):
+    """Catálogo con 3/4 de series FRED (1 de cada 5 diaria) y 1/4 BCCh (1 de cada 4 con primer código muerto)"""
+    catalog = {}
+    n_fred = n * 3 // 4
+    for i in range(n_fred):
+        sid = f"DSYN{i:03d}" if i % 5 == 0 else f"MSYN{i:03d}"
+        catalog[f"FRED {sid}"] = {"id": sid, "src": "fred", "units": "lin", "meta": {"frequency": "Daily" if i % 5 == 0 else "Monthly"}}
+    for i in range(n - n_fred):
+        ids = [f"F{i:03d}.SYN.IND.Z.M"]
+        if i % 4 == 0:
+            ids.insert(0, f"F{i:03d}.DEAD.Z.M")
+        catalog[f"BCCh {i:03d}"] = {"ids": ids, "src": "bcch", "calc_yoy_if_index": i % 2 == 0, "meta": {"frequency": "Mensual"}}
+    return catalog
+
+
+def start_stub(latency):
+    """Stub en un proceso aparte para que no compita por el GIL con el motor medido"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_server.py")
+    proc = subprocess.Popen([sys.executable, script, "--port", str(port), "--latency", str(latency)], stdout=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc, base
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("El stub no levantó")
+
+
+def run_threads(catalog, workers):
+    fred = {k: v for k, v in catalog.items() if v["src"] == "fred"}
+    bcch = {k: v for k, v in catalog.items() if v["src"] == "bcch"}
+    fetchers = {**de.fred_fetchers("stub", fred), **de.bcch_fetchers("stub", "stub", bcch)}
+    results, errors = de.fetch_parallel({name: fetch for name, (_, fetch, _) in fetchers.items()}, max_workers=workers)
+    return pd.concat([results[n].rename(n) for n in catalog if n in results], axis=1, sort=True), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="latencia simulada por respuesta (s)")
+    parser.add_argument("--workers", type=int, default=de.FETCH_MAX_WORKERS)
+    parser.add_argument("--per-host", type=int, default=async_engine.PER_HOST_LIMIT)
+    args = parser.parse_args()
+
+    proc, base = start_stub(args.latency)
+    de.FRED_API_URL = f"{base}/fred"
+    de.BCCH_URL = f"{base}/SieteRestWS/SieteRestWS.ashx"
+    catalog = synthetic_catalog(args.series)
+    print(f"{args.series} series, latencia {args.latency}s, {args.workers} hilos / {args.per_host} conexiones por host")
+
+    t0 = time.perf_counter()
+    df_threads, err_threads = run_threads(catalog, args.workers)
+    t_threads = time.perf_counter() - t0
+    print(f"hilos : {t_threads:6.2f}s  {df_threads.shape[1]} series, {len(err_threads)} errores")
+
+    if not async_engine.available():
+        print("async : aiohttp no está instalado")
+        proc.terminate()
+        return
+    t0 = time.perf_counter()
+    df_async, err_async = async_engine.fetch_catalog(catalog, "stub", "stub", "stub", per_host=args.per_host)
+    t_async = time.perf_counter() - t0
+    print(f"async : {t_async:6.2f}s  {df_async.shape[1]} series, {len(err_async)} errores")
+    same = df_threads.sort_index(axis=1).equals(df_async.sort_index(axis=1))
+    print(f"mismo DataFrame: {same}")
+
+    # Cancelación cooperativa: se cancela a mitad de lote y se mide cuánto tarda en soltar
+    cancel = threading.Event()
+    tasks = async_engine.fred_fetchers("stub", {k: v for k, v in catalog.items() if v["src"] == "fred"})
+    future = async_engine.submit_batch(tasks, cancel=cancel, per_host=args.per_host)
+    time.sleep(args.latency * 2)
+    t0 = time.perf_counter()
+    cancel.set()
+    results, errors = future.result()
+    print(f"cancelación: {time.perf_counter() - t0:.3f}s, {len(results)} completas, {len(tasks) - len(results) - len(errors)} canceladas")
+    proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
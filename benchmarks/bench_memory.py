@@ -0,0 +1,72 @@
+"""Benchmark de memoria y latencia por render: DataFrame ancho (unión de fechas) vs SeriesSet con índices nativos.
+
+    python benchmarks/bench_memory.py --sizes 13 100 1000
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from data_engine import SeriesSet, merge_frames  # noqa: E402
+from bench_merge import synthetic_series  # noqa: E402
+
+
+DATE_FROM, DATE_TO = pd.Timestamp("2000-01-01"), pd.Timestamp("2025-12-31")
+
+
+def wide_render(parts, y1, y2):
+    """Camino anterior: frame ancho memoizado, copia para transformar y copia filtrada con máscara"""
+    df_full = merge_frames(parts)
+    df_transformed = df_full.copy()
+    df_transformed[y1] = df_transformed[y1].copy().pct_change(12) * 100
+    df_filtered = df_transformed[(df_transformed.index >= DATE_FROM) & (df_transformed.index <= DATE_TO)]
+    return df_full, df_transformed, df_filtered
+
+
+def ragged_render(parts, y1, y2):
+    """Camino actual: las series del caché sin copiar, solo y1/y2 alineadas y el rango como slice"""
+    data = SeriesSet({s.name: s for s in parts})
+    chart = {y1: data[y1].pct_change(12) * 100, y2: data[y2]}
+    return data, merge_frames([s.rename(n) for n, s in chart.items()]).loc[DATE_FROM:DATE_TO]
+
+
+def median_ms(fn, *args, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return sorted(times)[repeat // 2] * 1000
+
+
+def peak_mib(fn, *args):
+    tracemalloc.start()
+    kept = fn(*args)  # noqa: F841 (lo retenido por el render cuenta en 'current')
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 2 ** 20, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[13, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'series':>7} {'datos MiB':>10} | {'ancho retenido':>14} {'pico':>7} {'ms':>7} | {'ragged retenido':>15} {'pico':>7} {'ms':>7}")
+    for n in args.sizes:
+        parts = synthetic_series(n)
+        raw = sum(int(s.memory_usage(index=True)) for s in parts) / 2 ** 20
+        y1, y2 = parts[1].name, parts[0].name  # una mensual y una diaria
+        w_kept, w_peak = peak_mib(wide_render, parts, y1, y2)
+        r_kept, r_peak = peak_mib(ragged_render, parts, y1, y2)
+        w_ms, r_ms = median_ms(wide_render, parts, y1, y2), median_ms(ragged_render, parts, y1, y2)
+        print(f"{n:>7} {raw:10.1f} | {w_kept:14.1f} {w_peak:7.1f} {w_ms:7.1f} | {r_kept:15.2f} {r_peak:7.2f} {r_ms:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark de armado del frame ancho: joins outer encadenados vs merge_frames en un solo paso.
+
+    python benchmarks/bench_merge.py --sizes 10 100 1000
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from data_engine import merge_frames  # noqa: E402
+
+
+def synthetic_series(n, seed=0):
+    """n series con frecuencias y rangos mezclados: 1 de cada 5 diaria hábil desde 1990, el resto mensual desde 1948-2000"""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        if i % 5 == 0:
+            idx = pd.bdate_range("1990-01-01", "2026-06-30")
+        else:
+            idx = pd.date_range(f"{1948 + (i * 7) % 53}-01-01", "2026-06-01", freq="MS")
+        out.append(pd.Series(rng.standard_normal(len(idx)).cumsum(), index=idx, name=f"S{i:04d}"))
+    return out
+
+
+def chained_join(parts):
+    """Armado previo: un join outer (y un sort) por serie"""
+    df = pd.DataFrame()
+    for s in parts:
+        df = s.to_frame() if df.empty else df.join(s, how='outer').sort_index()
+    return df
+
+
+def measure(fn, parts):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fn(parts)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'series':>7} {'filas':>7} | {'join s':>8} {'join MiB':>9} | {'merge s':>8} {'merge MiB':>9} | {'x':>6}")
+    for n in args.sizes:
+        parts = synthetic_series(n)
+        df_join, t_join, m_join = measure(chained_join, parts)
+        df_merge, t_merge, m_merge = measure(merge_frames, parts)
+        assert df_join.equals(df_merge)
+        print(f"{n:>7} {len(df_merge):>7} | {t_join:8.3f} {m_join:9.1f} | {t_merge:8.3f} {m_merge:9.1f} | {t_join / t_merge:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
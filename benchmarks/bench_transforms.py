@@ -0,0 +1,73 @@
+"""Benchmark de transformaciones de unidades: versión anterior (apply/lambda, rezagos fijos) vs transforms.apply_units.
+
+    python benchmarks/bench_transforms.py --points 20000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from transforms import apply_units, periods_per_year, UNIT_CODES  # noqa: E402
+
+
+SAME_DEFINITION = {"chg", "pch", "cch", "log"}  # el resto cambió de definición (rezago por fecha, anualización)
+
+
+def legacy_units(series, units_type):
+    """Copia de la versión anterior de app.apply_units_transformation"""
+    if units_type == "lin" or units_type is None:
+        return series
+    elif units_type == "chg":
+        return series.diff()
+    elif units_type == "ch1":
+        return series.diff(12)
+    elif units_type == "pch":
+        return series.pct_change() * 100
+    elif units_type == "pc1":
+        return series.pct_change(12) * 100
+    elif units_type == "pca":
+        return ((series / series.shift(1)) ** 12 - 1) * 100
+    elif units_type == "cch":
+        return (series / series.shift(1)).apply(lambda x: np.log(x) * 100 if x > 0 else None)
+    elif units_type == "cca":
+        return (series / series.shift(1)).apply(lambda x: np.log(x) * 1200 if x > 0 else None)
+    elif units_type == "log":
+        return series.apply(lambda x: np.log(x) if x > 0 else None)
+    return series
+
+
+def best_ms(fn, *args, repeat=7):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range(end="2026-06-30", periods=args.points)
+    series = pd.Series(4 + rng.standard_normal(args.points).cumsum() * 0.05, index=index, name="DSYN")
+    print(f"{args.points} puntos diarios hábiles ({index[0]:%Y}-{index[-1]:%Y}), {periods_per_year(index)} obs/año")
+    print(f"{'units':>5} | {'antes ms':>9} {'ahora ms':>9} {'x':>6} | {'máx |dif|':>10}")
+    for units in UNIT_CODES[1:]:
+        old, new = legacy_units(series, units), apply_units(series, units)
+        t_old, t_new = best_ms(legacy_units, series, units), best_ms(apply_units, series, units)
+        diff = np.nanmax(np.abs(old.to_numpy(dtype=float) - new.to_numpy(dtype=float))) if units in SAME_DEFINITION else None
+        print(f"{units:>5} | {t_old:9.2f} {t_new:9.2f} {t_old / t_new:6.1f} | {'-' if diff is None else f'{diff:.3g}':>10}")
+    print("ch1/pc1 difieren a propósito: antes comparaban contra 12 observaciones atrás (12 días hábiles), "
+          "ahora contra el dato de un año antes; pca/cca anualizan con obs/año en vez de 12")
+
+
+if __name__ == "__main__":
+    main()
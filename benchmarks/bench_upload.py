@@ -0,0 +1,88 @@
+"""Benchmark de ingesta de archivos propios: lectura anterior (openpyxl + to_numeric por columna) vs uploads.parse_upload.
+
+    python benchmarks/bench_upload.py --rows 20000 --sheets 4 --cols 10
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import uploads  # noqa: E402
+
+
+def synthetic_files(rows, sheets, cols, folder):
+    """Libro con 'sheets' hojas diarias (la primera con celdas de texto) y la primera hoja también en CSV y Parquet"""
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range(end="2026-06-30", periods=rows, name="Fecha")
+    paths = {"xlsx": os.path.join(folder, "libro.xlsx"), "csv": os.path.join(folder, "hoja.csv"), "parquet": os.path.join(folder, "hoja.parquet")}
+    with pd.ExcelWriter(paths["xlsx"]) as writer:
+        for s in range(sheets):
+            df = pd.DataFrame(rng.standard_normal((rows, cols)).cumsum(0), index=index, columns=[f"S{s}_{c}" for c in range(cols)])
+            if s == 0:
+                df = df.astype(object)
+                df.iloc[::50, 1] = "n/d"
+                df.to_csv(paths["csv"])
+                df.apply(pd.to_numeric, errors="coerce").to_parquet(paths["parquet"])
+            df.to_excel(writer, sheet_name=f"Hoja{s + 1}")
+    return paths
+
+
+def legacy_parse(data):
+    """Copia de la lectura anterior del uploader (solo la primera hoja)"""
+    import io
+    df_temp = pd.read_excel(io.BytesIO(data))
+    date_col = df_temp.columns[0]
+    df_temp[date_col] = pd.to_datetime(df_temp[date_col], errors='coerce')
+    df_temp = df_temp.dropna(subset=[date_col]).set_index(date_col).sort_index()
+    for c in df_temp.columns:
+        df_temp[c] = pd.to_numeric(df_temp[c], errors='coerce')
+    return df_temp.select_dtypes(include=['number'])
+
+
+def measure(fn):
+    """(segundos, pico MB, resultado); el pico se mide en una segunda pasada porque tracemalloc distorsiona el tiempo"""
+    t0 = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = synthetic_files(args.rows, args.sheets, args.cols, folder)
+        files = {ext: open(path, "rb").read() for ext, path in paths.items()}
+    print(f"{args.sheets} hojas x {args.rows:,} filas x {args.cols} columnas; xlsx {len(files['xlsx']) / 2 ** 20:.1f} MB")
+
+    seconds, peak, df = measure(lambda: legacy_parse(files["xlsx"]))
+    print(f"{'anterior (1 hoja)':<26} {seconds:7.2f}s  pico {peak:7.1f} MB  {df.shape[1]} series")
+    engines = ["openpyxl"] + (["calamine"] if uploads.excel_engine() == "calamine" else [])
+    for engine in engines:
+        uploads.excel_engine = lambda engine=engine: engine
+        for workers in (1, uploads.SHEET_MAX_WORKERS):
+            seconds, peak, parsed = measure(lambda: uploads.parse_upload(files["xlsx"], "libro.xlsx", max_workers=workers))
+            label = f"xlsx {engine} {workers} hilo{'s' if workers > 1 else ''}"
+            print(f"{label:<26} {seconds:7.2f}s  pico {peak:7.1f} MB  {parsed.summary().split(', ')[0]}")
+    for ext in ("csv", "parquet"):
+        seconds, peak, parsed = measure(lambda: uploads.parse_upload(files[ext], f"hoja.{ext}"))
+        print(f"{ext + ' (1 hoja)':<26} {seconds:7.2f}s  pico {peak:7.1f} MB  {parsed.summary().split(', ')[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Servidor local que imita FRED (series/observations y metadatos) y SieteRestWS (GetSeries).
+
+Genera datos sintéticos deterministas con una latencia configurable por respuesta, para medir
+los motores de descarga sin depender de la red ni de credenciales:
+
+    python benchmarks/stub_server.py --port 8765 --latency 0.2
+    XTB_FRED_API_URL=http://127.0.0.1:8765/fred \\
+    XTB_BCCH_URL=http://127.0.0.1:8765/SieteRestWS/SieteRestWS.ashx streamlit run app.py
+
+Convenciones: ids FRED que empiezan con "D" (DGS10, VIXCLS...) son diarios, el resto mensuales;
+códigos BCCh terminados en ".D" son diarios. Los códigos con "DEAD" responden sin observaciones
+y los ids con "REC" (USREC...) son indicadores de recesión 0/1.
+"""
+import json
+import math
+import time
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+DAILY_START = datetime.date(1990, 1, 1)
+MONTHLY_START = datetime.date(1948, 1, 1)
+
+
+def _dates(start, daily):
+    today = datetime.date.today()
+    if daily:
+        start = max(start, DAILY_START)
+        n = (today - start).days + 1
+        return [d for d in (start + datetime.timedelta(days=i) for i in range(n)) if d.weekday() < 5]
+    start = max(start, MONTHLY_START)
+    year, month = start.year, start.month + (start.day > 1)
+    out = []
+    while True:
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        d = datetime.date(year, month, 1)
+        if d > today:
+            return out
+        out.append(d)
+        month += 1
+
+
+def _value(series_id, d):
+    seed = sum(map(ord, series_id))
+    t = d.toordinal()
+    return 100 + seed % 50 + 10 * math.sin(t / (200 + seed % 100)) + (t % 7) / 10
+
+
+def _format(series_id, d):
+    if "REC" in series_id:
+        return str(int(math.sin(d.toordinal() / 400) > 0.9))
+    return f"{_value(series_id, d):.2f}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # el cliente canceló la descarga
+
+    def do_GET(self):
+        with StubHandler._lock:
+            StubHandler.requests_served += 1
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlsplit(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path
+
+        if path.endswith("/series/observations"):
+            sid = q["series_id"]
+            start = datetime.date.fromisoformat(q.get("observation_start", "1948-01-01"))
+            obs = [{"date": d.isoformat(), "value": _format(sid, d)} for d in _dates(start, sid.startswith("D"))]
+            return self._send({"count": len(obs), "observations": obs})
+        if path.endswith("/series"):
+            return self._send({"seriess": [{"id": q["series_id"], "last_updated": f"{datetime.date.today()} 08:00:00-05"}]})
+        if path.endswith("/series/release"):
+            return self._send({"releases": [{"id": sum(map(ord, q["series_id"][:3])) % 40, "name": "Stub release"}]})
+        if path.endswith("/release/dates"):
+            today = datetime.date.today()
+            dates = [today + datetime.timedelta(days=7 * k - 28) for k in range(12)]
+            return self._send({"release_dates": [{"release_id": q["release_id"], "date": d.isoformat()} for d in dates]})
+        if path.endswith("SieteRestWS.ashx"):
+            code = q["timeseries"]
+            if "DEAD" in code:
+                return self._send({"Codigo": -1, "Series": {"seriesId": code, "Obs": []}})
+            start = datetime.datetime.strptime(q["firstdate"], "%Y-%m-%d").date()
+            obs = [{"indexDateString": d.strftime("%d-%m-%Y"), "value": f"{_value(code, d):.2f}".replace(".", ","), "statusCode": "OK"}
+                   for d in _dates(start, code.endswith(".D"))]
+            return self._send({"Codigo": 0, "Series": {"seriesId": code, "Obs": obs}})
+        self._send({"error": "not found"}, 404)
+
+
+def start(port=0, latency=0.0):
+    """Levanta el servidor en un hilo; retorna (server, url_base)"""
+    handler = type("Handler", (StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos de espera por respuesta")
+    args = parser.parse_args()
+    server, base = start(args.port, args.latency)
+    print(f"Stub FRED: {base}/fred  |  Stub BCCh: {base}/SieteRestWS/SieteRestWS.ashx")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,141 @@
+"""Utilidades de gráficos para el dashboard (reducción de puntos, tipo de trazo, recesiones, caché de figuras), independientes de Streamlit."""
+import os
+import json
+import math
+import hashlib
+import functools
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from transforms import median_step
+
+DOWNSAMPLE_METHOD = os.environ.get("XTB_DOWNSAMPLE", "lttb")  # "lttb", "minmax" o "none"
+POINTS_PER_PIXEL = float(os.environ.get("XTB_POINTS_PER_PIXEL", "1"))
+MIN_POINTS = 200
+WEBGL_THRESHOLD = int(os.environ.get("XTB_WEBGL_THRESHOLD", "2000"))  # 0 desactiva WebGL
+FIGURE_CACHE_ENTRIES = int(os.environ.get("XTB_FIGURE_CACHE_ENTRIES", "64"))
+FIGURE_CACHE_MB = float(os.environ.get("XTB_FIGURE_CACHE_MB", "64"))
+RECESSION_FILL = "#e6e6e6"
+RECESSION_OPACITY = 0.5
+
+
+def target_points(chart_width, points_per_pixel=POINTS_PER_PIXEL):
+    """Puntos que vale la pena enviar para un gráfico de 'chart_width' píxeles"""
+    return max(MIN_POINTS, int(chart_width * points_per_pixel))
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: posiciones de los n_out puntos que mejor conservan la forma.
+
+    Siempre incluye el primer y el último punto. El recorrido es secuencial por bucket (cada
+    elección depende de la anterior), pero dentro de cada bucket el cálculo es vectorizado.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    csum_x = np.concatenate([[0.0], np.cumsum(x)])
+    csum_y = np.concatenate([[0.0], np.cumsum(y)])
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        count = nxt_end - end
+        avg_x = (csum_x[nxt_end] - csum_x[end]) / count
+        avg_y = (csum_y[nxt_end] - csum_y[end]) / count
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out):
+    """Mínimo y máximo de cada bucket (n_out/2 buckets), más el primer y último punto: conserva todos los picos"""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    size = math.ceil(n / (n_out // 2))
+    n_buckets = math.ceil(n / size)
+    values = np.full(n_buckets * size, np.nan)
+    values[:n] = y
+    values = values.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    return np.unique(np.concatenate([[0, n - 1], offsets + np.nanargmin(values, axis=1), offsets + np.nanargmax(values, axis=1)]))
+
+
+def downsample(series, chart_width, method=DOWNSAMPLE_METHOD):
+    """Serie reducida a la resolución del gráfico; si ya cabe (o method='none') se retorna tal cual.
+
+    Como se aplica sobre el rango ya filtrado, acotar las fechas en el panel trae más detalle.
+    """
+    n_out = target_points(chart_width)
+    if method == "none" or len(series) <= n_out:
+        return series
+    y = series.to_numpy(dtype=float)
+    if method == "minmax":
+        positions = minmax_indices(y, n_out)
+    else:
+        x = (series.index.asi8 - series.index.asi8[0]).astype(float)
+        positions = lttb_indices(x, y, n_out)
+    return series.iloc[positions]
+
+
+def scatter_class(n_points, threshold=WEBGL_THRESHOLD):
+    """go.Scattergl sobre 'threshold' puntos (pan y hover fluidos con miles de puntos), si no go.Scatter (SVG).
+
+    Ambos aceptan los mismos argumentos de línea, relleno, marcadores y eje, así el trazo se arma igual.
+    'n_points' es el largo de la serie antes de downsample: lo reducido nunca supera el ancho del
+    gráfico, así que con ese conteo WebGL no se activaría.
+    """
+    return go.Scattergl if threshold and n_points > threshold else go.Scatter
+
+
+def recession_bands(indicator):
+    """Tramos (inicio, fin) en que un indicador 0/1 (USREC y similares) vale 1.
+
+    El fin es la observación siguiente al último 1, así el último mes de recesión queda sombreado
+    completo; si la recesión sigue en curso se extiende un período.
+    """
+    indicator = indicator.dropna()
+    if indicator.empty:
+        return ()
+    flags = (indicator.to_numpy(dtype=float) > 0.5).astype(np.int8)
+    edges = np.diff(np.concatenate([[0], flags, [0]]))
+    index = indicator.index
+    step = median_step(index) or pd.Timedelta(days=31)
+    bounds = index.append(pd.DatetimeIndex([index[-1] + step]))
+    return tuple(zip(index[np.flatnonzero(edges == 1)], bounds[np.flatnonzero(edges == -1)]))
+
+
+@functools.lru_cache(maxsize=256)
+def recession_shapes(bands, x0, x1):
+    """Rectángulos de las recesiones que tocan [x0, x1], recortados al rango, para asignarlos al layout de una vez"""
+    return tuple(dict(type="rect", xref="x", yref="paper", x0=max(start, x0), x1=min(end, x1), y0=0, y1=1,
+                      fillcolor=RECESSION_FILL, opacity=RECESSION_OPACITY, layer="below", line_width=0)
+                 for start, end in bands if end > x0 and start < x1)
+
+
+def figure_key(data_key, **params):
+    """Hash de la figura: versiones de las series graficadas (data_key) más rango, formato y demás parámetros.
+
+    Sin data_key (alguna serie no versionada) retorna None y la figura no se cachea.
+    """
+    if data_key is None:
+        return None
+    raw = json.dumps([data_key, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def figure_nbytes(fig):
+    """Bytes estimados de una figura: arreglos de los trazos más imágenes embebidas (el logo en base64)"""
+    size = 0
+    for trace in fig.data:
+        for values in (getattr(trace, "x", None), getattr(trace, "y", None)):
+            if values is not None:
+                size += np.asarray(values).nbytes
+    return size + sum(len(image.source or "") for image in fig.layout.images)
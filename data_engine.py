@@ -0,0 +1,888 @@
+"""Motor de descarga de series para el dashboard (FRED / BCCh), independiente de Streamlit."""
+import os
+import time
+import logging
+import datetime
+from datetime import timedelta
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+import http_client
+from series_store import series_key, upsert_series
+
+log = logging.getLogger(__name__)
+
+FRED_START_DATE = "1948-01-01"
+FRED_API_URL = os.environ.get("XTB_FRED_API_URL", "https://api.stlouisfed.org/fred")
+REFRESH_OVERLAP_DAYS = 120  # se vuelve a pedir este tramo para recoger revisiones recientes
+BCCH_URL = os.environ.get("XTB_BCCH_URL", "https://si3.bcentral.cl/SieteRestWS/SieteRestWS.ashx")
+BCCH_START_DATE = "2000-01-01"
+BCCH_TIMEOUT = http_client.READ_TIMEOUT  # segundos por código
+METADATA_TIMEOUT = http_client.READ_TIMEOUT
+FRED_TIMEOUT = float(os.environ.get("XTB_FRED_TIMEOUT", "20"))  # las series diarias completas son pesadas
+METADATA_TTL = 6 * 3600
+FRED_REALTIME_START = "1776-07-04"  # primera fecha real-time de FRED: calendario completo, no solo el año en curso
+FRED_RELEASE_DATES_LIMIT = 10000  # máximo por pedido en /release/dates
+BCCH_YOY_PERIODS = 12
+FETCH_MAX_WORKERS = int(os.environ.get("XTB_FETCH_WORKERS", "8"))
+FETCH_TIMEOUT = float(os.environ.get("XTB_FETCH_TIMEOUT", "30"))  # segundos por serie
+BCCH_RACE_TIMEOUT = float(os.environ.get("XTB_BCCH_RACE_TIMEOUT", "15"))  # carrera completa; bajo FETCH_TIMEOUT
+# Conexiones al BCCh para las carreras, compartidas por todos los indicadores: junto con los
+# FETCH_MAX_WORKERS hilos de descarga no superan el pool por host del cliente HTTP
+BCCH_RACE_WORKERS = max(1, http_client.POOL_MAXSIZE - FETCH_MAX_WORKERS)
+
+
+def fetch_parallel(tasks, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+    """Ejecuta {nombre: callable} en un pool acotado y retorna (resultados, errores) por nombre.
+
+    El timeout se cuenta desde que cada tarea empieza a correr, no desde que entra a la cola,
+    así un catálogo grande no marca como vencidas series que todavía no arrancan.
+    """
+    results, errors = {}, {}
+    if not tasks:
+        return results, errors
+
+    started = {}
+
+    def run(name, fn):
+        started[name] = time.monotonic()
+        return fn()
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks))), thread_name_prefix="fetch")
+    pending = {pool.submit(run, name, fn): name for name, fn in tasks.items()}
+    try:
+        while pending:
+            now = time.monotonic()
+            deadlines = [started[n] + timeout - now for n in pending.values() if n in started]
+            poll = max(0.05, min(deadlines)) if deadlines else 0.25
+            done, _ = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    results[name] = fut.result()
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+            now = time.monotonic()
+            for fut, name in list(pending.items()):
+                if name in started and now - started[name] > timeout:
+                    errors[name] = f"Timeout ({timeout:g}s)"
+                    del pending[fut]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, errors
+
+
+def refresh_start(stored, default):
+    """Fecha desde la que pedir datos: el final guardado menos el tramo de revisiones, o 'default' si no hay nada"""
+    if stored is None or stored.empty:
+        return default
+    return (stored.index[-1] - pd.Timedelta(days=REFRESH_OVERLAP_DAYS)).strftime("%Y-%m-%d")
+
+
+def fred_observation_params(series_id, api_key, observation_start=FRED_START_DATE, units="lin"):
+    return {"series_id": series_id, "api_key": api_key, "file_type": "json",
+            "observation_start": observation_start, "units": units or "lin"}
+
+
+def parse_fred_observations(obs, series_id=None):
+    """Convierte la lista 'observations' de FRED en una serie float; las fechas sin dato ('.') se descartan"""
+    if not obs:
+        return pd.Series(dtype=float, name=series_id)
+    temp = pd.DataFrame(obs, columns=['date', 'value'])
+    values = pd.to_numeric(temp['value'], errors='coerce').to_numpy()
+    return pd.Series(values, index=pd.DatetimeIndex(pd.to_datetime(temp['date'])), name=series_id).dropna()
+
+
+def fetch_fred_observations(series_id, api_key, observation_start=FRED_START_DATE, units="lin", timeout=FRED_TIMEOUT):
+    """Observaciones de una serie FRED (/series/observations)"""
+    params = fred_observation_params(series_id, api_key, observation_start, units)
+    res = http_client.get(f"{FRED_API_URL}/series/observations", params=params, timeout=timeout)
+    http_client.raise_for_status(res)
+    return parse_fred_observations(res.json().get('observations'), series_id)
+
+
+def fetch_fred_series(api_key, series_id, units="lin", start_date=FRED_START_DATE, store=None):
+    """Descarga una serie FRED. Con almacén local solo pide el tramo posterior a la última observación guardada"""
+    key = series_key("fred", series_id, units)
+    stored = store.read(key) if store is not None else None
+    series = upsert_series(stored, fetch_fred_observations(series_id, api_key, refresh_start(stored, start_date), units))
+    if store is not None:
+        store.write(key, series, source="fred", id=series_id, units=units)
+    return series
+
+
+def fetch_fred_last_updated(series_id, api_key, timeout=METADATA_TIMEOUT):
+    """Fecha de última actualización de la serie en FRED (date) o None"""
+    res = http_client.get(f"{FRED_API_URL}/series", params={"series_id": series_id, "api_key": api_key, "file_type": "json"}, timeout=timeout)
+    http_client.raise_for_status(res)
+    seriess = res.json().get('seriess') or []
+    last_updated_str = seriess[0].get('last_updated', '') if seriess else ''
+    if not last_updated_str:
+        return None
+    # Formato: "2025-12-16 08:19:00-06"
+    return datetime.datetime.strptime(last_updated_str.split(' ')[0], "%Y-%m-%d").date()
+
+
+def fetch_fred_release_id(series_id, api_key, timeout=METADATA_TIMEOUT):
+    """release_id FRED al que pertenece la serie o None"""
+    params = {"series_id": series_id, "api_key": api_key, "file_type": "json"}
+    res = http_client.get(f"{FRED_API_URL}/series/release", params=params, timeout=timeout)
+    http_client.raise_for_status(res)
+    releases = res.json().get('releases') or []
+    return releases[0]['id'] if releases else None
+
+
+def fetch_fred_release_dates(release_id, api_key, timeout=METADATA_TIMEOUT):
+    """Fechas de publicación (date, ascendentes) de un release FRED, históricas y futuras.
+
+    Sin realtime_start FRED devuelve solo desde el 1 de enero del año en curso. Se piden las más
+    recientes primero: si el release supera el límite por pedido se pierden las más antiguas.
+    """
+    params = {"release_id": release_id, "api_key": api_key, "file_type": "json",
+              "include_release_dates_with_no_data": "true", "realtime_start": FRED_REALTIME_START,
+              "realtime_end": "9999-12-31", "sort_order": "desc", "limit": FRED_RELEASE_DATES_LIMIT}
+    res = http_client.get(f"{FRED_API_URL}/release/dates", params=params, timeout=timeout)
+    http_client.raise_for_status(res)
+    dates = [datetime.datetime.strptime(rd['date'], "%Y-%m-%d").date() for rd in res.json().get('release_dates') or []]
+    return sorted(dates)
+
+
+class FredMetadata:
+    """Metadatos FRED del catálogo en memoria: last_updated y release_id por serie, fechas por release_id.
+
+    Las fechas se guardan por release_id, así que series hermanas (CPIAUCSL, PCEPI...) comparten
+    una sola llamada a /release/dates. Las consultas de la interfaz (last_updated, next_release)
+    solo leen memoria; la red se usa en prefetch() y en el calendario de descargas.
+    """
+
+    def __init__(self, ttl=METADATA_TTL):
+        self.ttl = ttl
+        self._series = {}
+        self._releases = {}
+        self._release_locks = {}
+        self._lock = threading.Lock()
+        self._background = None
+
+    def _fresh(self, entry, now):
+        return entry is not None and now - entry["fetched_at"] < self.ttl
+
+    def series_info(self, series_id, api_key, force=False, lead=0):
+        """{last_updated, release_id} de la serie; con force solo se vuelve a pedir last_updated"""
+        now = time.time()
+        with self._lock:
+            entry = self._series.get(series_id)
+        if not force and self._fresh(entry, now + lead):
+            return entry
+        release_id = entry["release_id"] if entry and entry["release_id"] is not None else fetch_fred_release_id(series_id, api_key)
+        entry = {"last_updated": fetch_fred_last_updated(series_id, api_key), "release_id": release_id, "fetched_at": now}
+        with self._lock:
+            self._series[series_id] = entry
+        return entry
+
+    def release_dates(self, release_id, api_key, lead=0):
+        """Fechas del release; una sola descarga por release_id aunque la pidan varios hilos"""
+        with self._lock:
+            lock = self._release_locks.setdefault(release_id, threading.Lock())
+        with lock:
+            with self._lock:
+                entry = self._releases.get(release_id)
+            if not self._fresh(entry, time.time() + lead):
+                entry = {"dates": fetch_fred_release_dates(release_id, api_key), "fetched_at": time.time()}
+                with self._lock:
+                    self._releases[release_id] = entry
+        return entry["dates"]
+
+    def load(self, series_id, api_key, force=False, lead=0):
+        """(last_updated, fechas de publicación) de la serie, usando lo que ya esté en memoria.
+
+        'lead' (segundos) adelanta el vencimiento: se renueva lo que vencería dentro de ese margen.
+        """
+        info = self.series_info(series_id, api_key, force, lead)
+        dates = self.release_dates(info["release_id"], api_key, lead) if info["release_id"] is not None else []
+        return info["last_updated"], dates
+
+    def due(self, series_ids, lead=0, now=None):
+        """Series sin metadatos en memoria o que vencen dentro de 'lead' segundos"""
+        now = (now or time.time()) + lead
+        with self._lock:
+            return [sid for sid in dict.fromkeys(series_ids) if not self._fresh(self._series.get(sid), now)]
+
+    def prefetch(self, series_ids, api_key, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT, lead=0):
+        """Carga en un solo lote concurrente los metadatos vencidos (o por vencer) del catálogo; retorna errores"""
+        tasks = {sid: (lambda s=sid: self.load(s, api_key, lead=lead)) for sid in self.due(series_ids, lead)}
+        return fetch_parallel(tasks, max_workers=max_workers, timeout=timeout)[1]
+
+    def prefetch_in_background(self, series_ids, api_key, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+        """prefetch() en un hilo aparte, sin bloquear a quien llama; no lanza otro si ya hay uno en curso"""
+        if not self.due(series_ids):
+            return None
+        with self._lock:
+            if self._background is not None and self._background.is_alive():
+                return None
+            self._background = threading.Thread(target=self.prefetch, args=(series_ids, api_key, max_workers, timeout),
+                                                name="fred-metadata", daemon=True)
+            self._background.start()
+            return self._background
+
+    def last_updated(self, series_id):
+        """last_updated en memoria o None (no hace llamadas de red)"""
+        with self._lock:
+            return (self._series.get(series_id) or {}).get("last_updated")
+
+    def release_history(self, series_id):
+        """Fechas de publicación (ascendentes) en memoria del release de la serie; [] si no se cargaron (sin red)"""
+        with self._lock:
+            release_id = (self._series.get(series_id) or {}).get("release_id")
+            return list((self._releases.get(release_id) or {}).get("dates", []))
+
+    def next_release(self, series_id, today=None):
+        """Primera fecha de publicación >= hoy en memoria o None (no hace llamadas de red)"""
+        today = today or datetime.date.today()
+        with self._lock:
+            release_id = (self._series.get(series_id) or {}).get("release_id")
+            dates = (self._releases.get(release_id) or {}).get("dates", [])
+        return next((d for d in dates if d >= today), None)
+
+
+def fred_fetchers(api_key, indicators, start_date=FRED_START_DATE, store=None, scheduler=None):
+    """{nombre: (clave, fetch, schedule)} para las series FRED de {nombre: config}"""
+    def fetcher(config):
+        return lambda: fetch_fred_series(api_key, config["id"], config.get("units", "lin"), start_date, store)
+
+    def schedule(name, config):
+        if scheduler is None:
+            return ttl_schedule(config)
+        return scheduler.fred_schedule(name, config, api_key)
+
+    return {name: (cache_key(config), fetcher(config), schedule(name, config)) for name, config in indicators.items()}
+
+
+# --- BCCh ---
+_bcch_preferred_code = {}  # indicador -> último código que respondió con datos
+_bcch_lock = threading.Lock()
+
+
+def parse_bcch_observations(obs):
+    """Convierte la lista 'Obs' de SieteRestWS en una serie numérica indexada por fecha"""
+    temp = pd.DataFrame(obs)
+    dates = pd.to_datetime(temp['indexDateString'], dayfirst=True, errors='coerce')
+    values = pd.to_numeric(temp['value'].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    series = pd.Series(values.to_numpy(), index=pd.DatetimeIndex(dates)).dropna()
+    series = series[series.index.notna()]
+    return series[~series.index.duplicated(keep='last')]
+
+
+def bcch_params(user, password, code, first_date=BCCH_START_DATE, last_date=None):
+    if last_date is None:
+        last_date = f"{datetime.datetime.now().year}-12-31"
+    return {"user": user, "pass": password, "firstdate": first_date, "lastdate": last_date,
+            "timeseries": code, "function": "GetSeries"}
+
+
+def bcch_series_from_json(data, code):
+    """Serie de una respuesta GetSeries; LookupError si no trae observaciones"""
+    obs = (data.get('Series') or {}).get('Obs') or []
+    series = parse_bcch_observations(obs) if obs else pd.Series(dtype=float)
+    if series.empty:
+        raise LookupError(f"{code}: sin observaciones")
+    return series
+
+
+def fetch_bcch_code(user, password, code, first_date=BCCH_START_DATE, last_date=None, timeout=BCCH_TIMEOUT, retries=http_client.MAX_RETRIES):
+    """Descarga un código BCCh. Lanza excepción si la API falla o no trae observaciones"""
+    res = http_client.get(BCCH_URL, params=bcch_params(user, password, code, first_date, last_date), timeout=timeout, retries=retries)
+    http_client.raise_for_status(res)
+    return bcch_series_from_json(res.json(), code)
+
+
+def fetch_bcch_code_incremental(user, password, code, first_date=BCCH_START_DATE, last_date=None, timeout=BCCH_TIMEOUT, store=None,
+                                retries=http_client.MAX_RETRIES):
+    """Descarga un código BCCh pidiendo solo el tramo desde la última observación guardada.
+
+    Retorna (serie completa, fecha desde la que cambió); la fecha es None si se descargó todo.
+    """
+    key = series_key("bcch", code)
+    stored = store.read(key) if store is not None else None
+    fresh = fetch_bcch_code(user, password, code, refresh_start(stored, first_date), last_date, timeout, retries)
+    return store_bcch_code(code, stored, fresh, store)
+
+
+def store_bcch_code(code, stored, fresh, store=None):
+    """Une lo descargado con lo guardado y persiste. Retorna (serie completa, fecha desde la que cambió o None)"""
+    has_stored = stored is not None and not stored.empty
+    series = upsert_series(stored, fresh)
+    if store is not None:
+        store.write(series_key("bcch", code), series, source="bcch", id=code, units="lin")
+    return series, (fresh.index[0] if has_stored else None)
+
+
+def update_yoy(raw, stored_yoy=None, changed_from=None, periods=BCCH_YOY_PERIODS):
+    """Variación % contra 'periods' observaciones atrás, recalculada solo desde changed_from si hay guardada"""
+    if stored_yoy is None or stored_yoy.empty or changed_from is None:
+        return (raw.pct_change(periods) * 100).dropna()
+    pos = raw.index.searchsorted(changed_from)
+    tail = (raw.iloc[max(0, pos - periods):].pct_change(periods) * 100).dropna()
+    return upsert_series(stored_yoy[stored_yoy.index < changed_from], tail)
+
+
+_race_pool = ThreadPoolExecutor(max_workers=BCCH_RACE_WORKERS, thread_name_prefix="bcch-race")
+
+
+def race_codes(fetch, codes, deadline=BCCH_RACE_TIMEOUT, pool=None):
+    """Lanza todos los códigos a la vez y retorna (código, resultado) del primero de la lista con datos.
+
+    Respeta la prioridad del catálogo, pero como todos corren en paralelo el tiempo total
+    queda acotado por el código más lento que haya que esperar, no por la suma de timeouts.
+    Pasado 'deadline' un código que no respondió cuenta como fallido: gana el mejor que ya
+    tenga datos. Los intentos corren en un pool compartido (BCCH_RACE_WORKERS conexiones).
+    """
+    if not codes:
+        raise LookupError("Sin códigos configurados")
+    futures = [(pool or _race_pool).submit(fetch, code) for code in codes]
+    stop_at = time.monotonic() + deadline
+    try:
+        failures = []
+        for code, fut in zip(codes, futures):
+            try:
+                return code, fut.result(timeout=max(0.0, stop_at - time.monotonic()))
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}" if fut.done() else f"{code}: sin respuesta en {deadline:g}s")
+        raise LookupError(" | ".join(failures))
+    finally:
+        for fut in futures:
+            fut.cancel()
+
+
+def preferred_bcch_code(name):
+    with _bcch_lock:
+        return _bcch_preferred_code.get(name)
+
+
+def remember_bcch_code(name, code):
+    with _bcch_lock:
+        _bcch_preferred_code[name] = code
+
+
+def finish_bcch_indicator(name, config, code, series, changed_from, store=None):
+    """Aplica la variación anual a los índices (calc_yoy_if_index) y nombra la serie"""
+    if config.get("calc_yoy_if_index", False) and "IND" in code:
+        key = series_key("bcch", code, f"yoy{BCCH_YOY_PERIODS}")
+        stored_yoy = store.read(key) if store is not None else None
+        series = update_yoy(series, stored_yoy, changed_from)
+        if store is not None:
+            store.write(key, series, source="bcch", id=code, units=f"yoy{BCCH_YOY_PERIODS}")
+    return series.rename(name)
+
+
+def fetch_bcch_indicator(user, password, name, config, first_date=BCCH_START_DATE, last_date=None, timeout=BCCH_TIMEOUT, store=None):
+    """Descarga un indicador BCCh probando primero el código recordado y luego compitiendo entre los demás.
+
+    En la carrera cada código se intenta una sola vez: los demás códigos ya son el respaldo.
+    """
+    codes = list(config.get("ids", []))
+    fetch = lambda code, retries=http_client.MAX_RETRIES: fetch_bcch_code_incremental(user, password, code, first_date, last_date,
+                                                                                      timeout, store, retries)
+
+    preferred = preferred_bcch_code(name)
+    result = None
+    if preferred in codes:
+        try:
+            result = preferred, fetch(preferred)
+        except Exception:
+            codes.remove(preferred)
+    if result is None:
+        result = race_codes(lambda code: fetch(code, retries=0), codes)
+        remember_bcch_code(name, result[0])
+
+    code, (series, changed_from) = result
+    return finish_bcch_indicator(name, config, code, series, changed_from, store)
+
+
+def bcch_fetchers(user, password, indicators, store=None, scheduler=None):
+    """{nombre: (clave, fetch, schedule)} para los indicadores BCCh de {nombre: config}"""
+    def fetcher(name, config):
+        return lambda: fetch_bcch_indicator(user, password, name, config, store=store)
+
+    def schedule(name, config):
+        if scheduler is None:
+            return ttl_schedule(config)
+        return scheduler.estimated_schedule(name, config)
+
+    return {name: (cache_key(config), fetcher(name, config), schedule(name, config)) for name, config in indicators.items()}
+
+
+# --- CACHÉ POR SERIE ---
+FREQUENCY_TTL = {  # segundos
+    "Daily": 3600, "Diaria": 3600,
+    "Weekly": 6 * 3600, "Semanal": 6 * 3600,
+    "Monthly": 24 * 3600, "Mensual": 24 * 3600,
+    "Quarterly": 3 * 24 * 3600, "Trimestral": 3 * 24 * 3600,
+}
+DEFAULT_TTL = 3600
+FAILURE_TTL = 300  # una serie fallida se reintenta sola, sin arrastrar al resto
+
+
+def cache_key(config):
+    """Clave de caché (fuente, id, unidades) de un indicador del catálogo"""
+    src = config.get("src")
+    if src == "fred":
+        return ("fred", config["id"], config.get("units", "lin"))
+    if src == "bcch":
+        return ("bcch", "|".join(config.get("ids", [])), "yoy" if config.get("calc_yoy_if_index") else "lin")
+    return (src or "custom", config.get("id", ""), config.get("units", "lin"))
+
+
+def ttl_for(config):
+    """TTL en segundos según meta.frequency del indicador"""
+    return FREQUENCY_TTL.get(config.get("meta", {}).get("frequency"), DEFAULT_TTL)
+
+
+def ttl_schedule(config):
+    """schedule(series, changed) -> vencimiento (epoch) con TTL fijo según frecuencia"""
+    ttl = ttl_for(config)
+    return lambda series, changed: time.time() + ttl
+
+
+# --- CALENDARIO DE PUBLICACIONES ---
+RELEASE_RETRY = 3600  # publicación ya ocurrida pero sin dato nuevo: reintentar cada hora
+RELEASE_MAX_WAIT = 7 * 24 * 3600  # tope de espera cuando la fecha es solo una estimación
+
+
+def estimate_next_release(last_date, frequency):
+    """Estima la próxima fecha de publicación basada en la frecuencia (fallback)"""
+    if frequency in ["Monthly", "Mensual"]:
+        next_month = last_date + timedelta(days=35)
+        return next_month.replace(day=15)
+    elif frequency in ["Weekly", "Semanal"]:
+        return last_date + timedelta(days=7)
+    elif frequency in ["Daily", "Diaria"]:
+        return last_date + timedelta(days=1)
+    elif frequency in ["Quarterly", "Trimestral"]:
+        return last_date + timedelta(days=95)
+    return last_date + timedelta(days=30)
+
+
+def _day_start(day):
+    return datetime.datetime.combine(day, datetime.time()).timestamp()
+
+
+def at_release(schedule):
+    """Marca un schedule que vence en una publicación: el CacheWarmer no lo adelanta (antes no hay datos nuevos)"""
+    schedule.at_release = True
+    return schedule
+
+
+class ReleaseScheduler:
+    """Tabla de próximas publicaciones por indicador que fija hasta cuándo sirve cada entrada del caché.
+
+    Entre publicaciones la entrada no vence, así que el caché responde sin llamadas de red.
+    Con fechas reales de FRED (vía FredMetadata) se compara contra 'last_updated': si la publicación ya pasó y
+    la serie aún no la refleja, se reintenta cada RELEASE_RETRY. Para BCCh (fecha estimada)
+    se avanza la estimación hasta el futuro y se acota la espera con RELEASE_MAX_WAIT.
+    """
+
+    def __init__(self, metadata=None):
+        self.metadata = metadata or FredMetadata()
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, next_release, expires_at, basis):
+        with self._lock:
+            self._table[name] = {"next_release": next_release, "next_refresh": datetime.datetime.fromtimestamp(expires_at), "basis": basis}
+        return expires_at
+
+    def table(self):
+        """DataFrame con próxima publicación y próxima descarga por indicador"""
+        with self._lock:
+            rows = dict(self._table)
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def next_release(self, name):
+        with self._lock:
+            return (self._table.get(name) or {}).get("next_release")
+
+    def estimated_schedule(self, name, config):
+        """schedule(series, changed) basado en estimate_next_release desde la última observación"""
+        frequency = config.get("meta", {}).get("frequency")
+
+        def schedule(series, changed):
+            now = time.time()
+            today = datetime.date.fromtimestamp(now)
+            next_release = estimate_next_release(series.index[-1].date(), frequency)
+            while next_release <= today:
+                next_release = estimate_next_release(next_release, frequency)
+            return self._record(name, next_release, min(_day_start(next_release), now + RELEASE_MAX_WAIT), "estimada")
+
+        return at_release(schedule)
+
+    def fred_schedule(self, name, config, api_key):
+        """schedule(series, changed) con el calendario real del release FRED de la serie"""
+        fallback = self.estimated_schedule(name, config)
+
+        def schedule(series, changed):
+            try:
+                last_updated, dates = self.metadata.load(config["id"], api_key, force=True)
+            except Exception:
+                return fallback(series, changed)
+            captured = last_updated or datetime.date.today() - timedelta(days=1)
+            upcoming = [d for d in dates if d > captured]
+            if not upcoming:
+                return fallback(series, changed)
+            now = time.time()
+            start = _day_start(upcoming[0])
+            expires_at = now + RELEASE_RETRY if start <= now else start
+            return self._record(name, upcoming[0], expires_at, "FRED")
+
+        return at_release(schedule)
+
+
+def merge_frames(parts):
+    """Alinea series y DataFrames en un solo paso sobre la unión ordenada de sus fechas.
+
+    Reemplaza las cadenas de join(how='outer'), que copian el frame acumulado en cada paso.
+    Si un índice trae fechas repetidas se conserva la última observación.
+    """
+    frames = []
+    for part in parts:
+        if part is None or part.empty:
+            continue
+        if isinstance(part, pd.Series):
+            part = part.to_frame()
+        if part.index.has_duplicates:
+            part = part[~part.index.duplicated(keep='last')]
+        frames.append(part)
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0] if frames[0].index.is_monotonic_increasing else frames[0].sort_index()
+    if not all(isinstance(f.index, pd.DatetimeIndex) and f.index.tz is None and (f.dtypes == "float64").all() for f in frames):
+        return pd.concat(frames, axis=1, sort=True)
+    # Caso típico (series float por fecha): una sola matriz del tamaño final, llenada columna a columna
+    index = pd.DatetimeIndex(np.unique(np.concatenate([f.index.values for f in frames])))
+    names = {f.index.name for f in frames}
+    index.name = names.pop() if len(names) == 1 else None
+    data = np.full((len(index), sum(f.shape[1] for f in frames)), np.nan, order="F")
+    col = 0
+    for f in frames:
+        data[index.get_indexer(f.index), col:col + f.shape[1]] = f.to_numpy()
+        col += f.shape[1]
+    return pd.DataFrame(data, index=index, columns=[c for f in frames for c in f.columns], copy=False)
+
+
+class SeriesSet(Mapping):
+    """Series por nombre, cada una en su propio índice y sin NaN de relleno.
+
+    Reemplaza al DataFrame ancho (unión de todas las fechas desde 1948, casi todo NaN): las
+    series no se copian al armar el conjunto y solo se alinean cuando se piden juntas (frame).
+    El constructor asume series ya limpias (como las del caché); add limpia las de otro origen.
+    El nombre de cada serie es la clave, no su atributo .name. Cada serie puede llevar un token
+    estable (origen + versión de los datos) que sirve de clave para cachear cálculos derivados.
+    """
+
+    def __init__(self, series=None, tokens=None):
+        self._series = dict(series or {})
+        self._tokens = dict(tokens or {})
+
+    @classmethod
+    def union(cls, *sets):
+        """Une varios conjuntos; ante nombres repetidos gana el último"""
+        out = cls()
+        for other in sets:
+            out._series.update(other._series)
+            out._tokens.update(other._tokens)
+        return out
+
+    def add(self, name, series, token=None):
+        if series is None:
+            return
+        if series.hasnans:
+            series = series.dropna()
+        if not series.empty:
+            self._series[name] = series
+            self._tokens[name] = token
+
+    def token(self, name):
+        """Token (origen, versión) de la serie o None si no se conoce su procedencia"""
+        return self._tokens.get(name)
+
+    def __getitem__(self, name):
+        return self._series[name]
+
+    def __iter__(self):
+        return iter(self._series)
+
+    def __len__(self):
+        return len(self._series)
+
+    @property
+    def empty(self):
+        return not self._series
+
+    def rename(self, mapping):
+        return SeriesSet({mapping.get(name, name): s for name, s in self._series.items()},
+                         {mapping.get(name, name): t for name, t in self._tokens.items()})
+
+    def frame(self, names=None):
+        """DataFrame alineado solo con las series pedidas (todas si names es None)"""
+        names = self._series if names is None else [n for n in names if n in self._series]
+        return merge_frames([self._series[n].rename(n) for n in names])
+
+    def nbytes(self):
+        return sum(int(s.memory_usage(index=True)) for s in self._series.values())
+
+
+class SeriesCache:
+    """Caché en memoria, por serie, compartido por todas las sesiones del proceso.
+
+    Cada entrada guarda la serie, su vencimiento y una versión que sube cuando cambian los datos.
+    Si una descarga falla se conserva la serie anterior y se reintenta tras FAILURE_TTL.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def is_fresh(self, key, now=None):
+        entry = self.entry(key)
+        return entry is not None and entry["expires_at"] > (now or time.time())
+
+    def changed(self, key, series):
+        """True si la serie difiere de la guardada en la entrada"""
+        entry = self.entry(key)
+        if series is not None and series.hasnans:
+            series = series.dropna()
+        return entry is None or entry["series"] is None or not entry["series"].equals(series)
+
+    def put(self, key, series, expires_at, changed=True, now=None, warm_early=True):
+        """Guarda la serie sin NaN: las lecturas (SeriesSet) la usan tal cual, sin limpiar en cada render.
+
+        Con warm_early=False (vencimiento en una publicación) el CacheWarmer no la renueva antes de expires_at.
+        """
+        now = now or time.time()
+        if series is not None and series.hasnans:
+            series = series.dropna()
+        with self._lock:
+            old = self._entries.get(key)
+            self._entries[key] = {
+                "series": series,
+                "version": (old["version"] + 1 if old else 1) if changed or old is None else old["version"],
+                "fetched_at": now,
+                "expires_at": expires_at,
+                "warm_early": warm_early,
+                "error": None,
+            }
+
+    def fail(self, key, error, now=None):
+        now = now or time.time()
+        with self._lock:
+            old = self._entries.get(key) or {"series": None, "version": 0, "fetched_at": None}
+            self._entries[key] = {**old, "expires_at": now + FAILURE_TTL, "error": error}
+
+    def due(self, fetchers, within=0, now=None):
+        """Subconjunto de {nombre: (clave, fetch, schedule)} que vence dentro de 'within' segundos.
+
+        Las entradas fallidas y las que vencen en una publicación (warm_early=False) cuentan recién
+        al vencer: antes no hay dato nuevo, y las fallidas respetan FAILURE_TTL entre reintentos.
+        """
+        now = now or time.time()
+        out = {}
+        with self._lock:
+            for name, f in fetchers.items():
+                entry = self._entries.get(f[0])
+                early = within if not entry or (not entry["error"] and entry.get("warm_early", True)) else 0
+                if entry is None or entry["expires_at"] <= now + early:
+                    out[name] = f
+        return out
+
+    def refresh(self, fetchers, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT, force=False, runner=None, cold_only=False):
+        """Descarga solo las series vencidas de {nombre: (clave, fetch, schedule)}; retorna errores de esta pasada.
+
+        Si otra sesión ya está descargando una serie, se reutiliza esa descarga: se espera solo
+        cuando todavía no hay datos que servir. 'runner' permite otro motor de descarga
+        (p. ej. async_engine): recibe {nombre: fetch} y retorna (resultados, errores); las series
+        que no aparezcan en ninguno de los dos (canceladas) quedan vencidas para la próxima pasada.
+        Con cold_only solo se descargan las series sin datos: las vencidas se sirven igual y
+        las renueva el CacheWarmer.
+        """
+        now = time.time()
+        claimed, waiting = {}, []
+        with self._lock:
+            for name, (key, fetch, schedule) in fetchers.items():
+                entry = self._entries.get(key)
+                if not force and entry is not None and entry["expires_at"] > now:
+                    continue
+                if cold_only and entry is not None and entry["series"] is not None:
+                    continue
+                if key in self._inflight:
+                    if entry is None or entry["series"] is None:
+                        waiting.append(self._inflight[key])
+                    continue
+                self._inflight[key] = threading.Event()
+                claimed[name] = (key, fetch, schedule)
+
+        errors = {}
+        if claimed:
+            try:
+                if runner is None:
+                    tasks = {name: self._task(key, fetch, schedule) for name, (key, fetch, schedule) in claimed.items()}
+                    results, errors = fetch_parallel(tasks, max_workers=max_workers, timeout=timeout)
+                else:
+                    fetched, errors = runner({name: fetch for name, (_, fetch, _) in claimed.items()})
+                    tasks = {name: self._schedule_task(claimed[name][0], series, claimed[name][2]) for name, series in fetched.items()}
+                    results, schedule_errors = fetch_parallel(tasks, max_workers=max_workers, timeout=timeout)
+                    errors = {**errors, **schedule_errors}
+                for name, (key, _, schedule) in claimed.items():
+                    if name in results:
+                        series, changed, expires_at = results[name]
+                        self.put(key, series, expires_at, changed, warm_early=not getattr(schedule, "at_release", False))
+                    elif name in errors:
+                        self.fail(key, errors[name])
+            finally:
+                with self._lock:
+                    for key, _, _ in claimed.values():
+                        self._inflight.pop(key).set()
+        for event in waiting:
+            event.wait(timeout)
+        return errors
+
+    def _task(self, key, fetch, schedule):
+        """Descarga y calcula el vencimiento en el mismo hilo del pool"""
+        def run():
+            return self._schedule_task(key, fetch(), schedule)()
+        return run
+
+    def _schedule_task(self, key, series, schedule):
+        def run():
+            changed = self.changed(key, series)
+            return series, changed, schedule(series, changed)
+        return run
+
+    def errors(self, indicators):
+        """{nombre: error} de la última descarga fallida de cada indicador"""
+        out = {}
+        for name, config in indicators.items():
+            entry = self.entry(cache_key(config))
+            if entry and entry["error"]:
+                out[name] = entry["error"]
+        return out
+
+    def series_set(self, indicators):
+        """SeriesSet con la serie vigente de cada indicador (las mismas del caché, sin copiar)"""
+        with self._lock:
+            entries = {name: (cache_key(config), self._entries.get(cache_key(config))) for name, config in indicators.items()}
+        entries = {name: (key, e) for name, (key, e) in entries.items() if e and e["series"] is not None}
+        return SeriesSet({name: e["series"] for name, (_, e) in entries.items()},
+                         {name: (key, e["version"]) for name, (key, e) in entries.items()})
+
+
+WARM_INTERVAL = float(os.environ.get("XTB_WARM_INTERVAL", "60"))  # segundos entre ciclos
+WARM_LEAD = float(os.environ.get("XTB_WARM_LEAD", "300"))  # se renueva lo que vence dentro de este margen
+
+
+class CacheWarmer:
+    """Hilo de fondo que renueva las entradas del SeriesCache antes de que venzan.
+
+    Cada fuente registra sus fetchers (con las credenciales de la última sesión que la usó) y se
+    acumulan: toda serie que alguna sesión pidió queda al día. Cada ciclo descarga lo que vence
+    dentro de WARM_LEAD, y también los metadatos FRED registrados con register_metadata. Los
+    ciclos nunca se solapan: si uno sigue en curso cuando toca el siguiente, este se omite.
+    """
+
+    def __init__(self, cache, interval=WARM_INTERVAL, lead=WARM_LEAD):
+        self.cache = cache
+        self.interval = interval
+        self.lead = lead
+        self.last_cycle = None
+        self._sources = {}
+        self._metadata = None
+        self._lock = threading.Lock()
+        self._cycle_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def register(self, source, fetchers, runner=None, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+        """Agrega fetchers {nombre: (clave, fetch, schedule)} a los que el hilo mantiene al día para 'source'"""
+        with self._lock:
+            known = self._sources[source][0] if source in self._sources else {}
+            self._sources[source] = ({**known, **fetchers}, runner, max_workers, timeout)
+
+    def register_metadata(self, metadata, series_ids, api_key, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+        """Agrega series cuyos metadatos (FredMetadata) el hilo renueva antes de que venzan"""
+        with self._lock:
+            known = self._metadata[1] if self._metadata and self._metadata[0] is metadata else ()
+            self._metadata = (metadata, tuple(dict.fromkeys([*known, *series_ids])), api_key, max_workers, timeout)
+
+    def start(self):
+        with self._lock:
+            if not self.running:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_cycle()
+            except Exception:
+                log.exception("Ciclo de precalentamiento falló")
+
+    def run_cycle(self):
+        """Renueva lo que vence pronto en todas las fuentes. Retorna el resumen, o None si ya hay un ciclo corriendo"""
+        if not self._cycle_lock.acquire(blocking=False):
+            log.warning("Ciclo de precalentamiento omitido: el anterior sigue en curso")
+            return None
+        try:
+            with self._lock:
+                sources = dict(self._sources)
+                metadata = self._metadata
+            started = time.time()
+            t0 = time.perf_counter()
+            summary = {"started": started, "series": 0, "errors": 0, "sources": {}}
+            for source, (fetchers, runner, max_workers, timeout) in sources.items():
+                due = self.cache.due(fetchers, self.lead, started)
+                if not due:
+                    continue
+                t_source = time.perf_counter()
+                errors = self.cache.refresh(due, max_workers=max_workers, timeout=timeout, force=True, runner=runner)
+                elapsed = time.perf_counter() - t_source
+                summary["sources"][source] = {"series": len(due), "errors": len(errors), "seconds": round(elapsed, 3)}
+                summary["series"] += len(due)
+                summary["errors"] += len(errors)
+                log.info("Precalentamiento %s: %d series en %.2fs (%d errores)", source, len(due), elapsed, len(errors))
+            if metadata is not None:
+                summary["metadata"] = self._refresh_metadata(*metadata, started)
+            summary["seconds"] = round(time.perf_counter() - t0, 3)
+            log.info("Ciclo de precalentamiento: %d series en %.2fs (%d errores)", summary["series"], summary["seconds"], summary["errors"])
+            self.last_cycle = summary
+            return summary
+        finally:
+            self._cycle_lock.release()
+
+    def _refresh_metadata(self, metadata, series_ids, api_key, max_workers, timeout, started):
+        """Renueva los metadatos que vencen dentro de 'lead'; retorna su resumen"""
+        due = metadata.due(series_ids, self.lead, started)
+        if not due:
+            return {"series": 0, "errors": 0, "seconds": 0.0}
+        t0 = time.perf_counter()
+        errors = metadata.prefetch(due, api_key, max_workers=max_workers, timeout=timeout, lead=self.lead)
+        elapsed = time.perf_counter() - t0
+        log.info("Precalentamiento metadatos FRED: %d series en %.2fs (%d errores)", len(due), elapsed, len(errors))
+        return {"series": len(due), "errors": len(errors), "seconds": round(elapsed, 3)}
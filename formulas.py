@@ -0,0 +1,207 @@
+"""Motor de fórmulas del dashboard: expresiones sobre series con nombre (a, b, c...), compiladas una vez y evaluadas vectorizadas.
+
+Solo se acepta un subconjunto de Python: números, variables, + - * / // % **, signos y llamadas a
+las funciones de FUNCTIONS. Cualquier otra construcción (atributos, índices, lambdas, builtins)
+se rechaza al compilar, así una fórmula no puede ejecutar código arbitrario.
+"""
+import ast
+import functools
+import contextvars
+
+import numpy as np
+import pandas as pd
+
+from transforms import apply_units, median_step
+from data_engine import merge_frames
+
+MAX_FORMULA_LENGTH = 200
+MAX_WINDOW = 10000
+# Durante evaluate: {id(serie alineada as-of): (serie alineada, serie original)}
+_as_of_sources = contextvars.ContextVar("formula_as_of_sources", default={})
+
+_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+
+
+class FormulaError(ValueError):
+    pass
+
+
+def _on_native_index(fn):
+    """Aplica fn sobre las observaciones propias de la serie (sin los NaN de la alineación) y reindexa.
+
+    Si x es una entrada alineada as-of, fn corre sobre la serie original y el resultado se alinea
+    igual: con los valores arrastrados, diff() o rolling_mean() mirarían días y no observaciones.
+    """
+    @functools.wraps(fn)
+    def wrapper(x, *args):
+        if not isinstance(x, pd.Series):
+            raise FormulaError(f"{fn.__name__}() requiere una serie")
+        aligned, source = _as_of_sources.get().get(id(x), (None, None))
+        if aligned is x:
+            return as_of(fn(source.dropna(), *args), x.index)
+        native = x.dropna()
+        out = fn(native, *args)
+        return out if len(native) == len(x) else out.reindex(x.index)
+    return wrapper
+
+
+def _window(n):
+    if isinstance(n, pd.Series) or n != int(n) or not 1 <= n <= MAX_WINDOW:
+        raise FormulaError(f"La ventana debe ser un entero entre 1 y {MAX_WINDOW}")
+    return int(n)
+
+
+def _elementwise(ufunc):
+    def fn(x):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return ufunc(x)
+    return fn
+
+
+@_on_native_index
+def diff(x, n=1):
+    return x.diff(_window(n))
+
+
+@_on_native_index
+def lag(x, n=1):
+    return x.shift(_window(n))
+
+
+@_on_native_index
+def rolling_mean(x, n):
+    return x.rolling(_window(n)).mean()
+
+
+@_on_native_index
+def yoy(x):
+    """Variación % contra el dato de un año calendario antes (como 'pc1')"""
+    return apply_units(x, "pc1")
+
+
+def log(x):
+    if isinstance(x, pd.Series):
+        return apply_units(x, "log")
+    return float(np.log(x)) if x > 0 else np.nan
+
+
+FUNCTIONS = {
+    "log": log,
+    "exp": _elementwise(np.exp),
+    "sqrt": _elementwise(np.sqrt),
+    "abs": _elementwise(np.abs),
+    "diff": diff,
+    "lag": lag,
+    "rolling_mean": rolling_mean,
+    "yoy": yoy,
+}
+
+
+def as_of(series, index):
+    """Último valor de 'series' vigente en cada fecha de 'index', sin extenderlo más de un período tras su último dato"""
+    series = series.dropna()
+    if series.empty:
+        return pd.Series(np.nan, index=index)
+    out = series.reindex(index, method="ffill")
+    step = median_step(series.index)
+    if step is not None:
+        out[index > series.index[-1] + step] = np.nan
+    return out
+
+
+class _Validator(ast.NodeTransformer):
+    """Recorre el AST: rechaza lo que no está en la lista blanca y pasa las constantes a float"""
+
+    def __init__(self):
+        self.variables = set()
+
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Constant, ast.Load)
+                          + _BIN_OPS + _UNARY_OPS):
+            raise FormulaError(f"Expresión no permitida: {type(node).__name__}")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError(f"Constante no permitida: {node.value!r}")
+        # En float, una potencia enorme desborda al instante en vez de calcular un entero gigante
+        return ast.copy_location(ast.Constant(float(node.value)), node)
+
+    def visit_Name(self, node):
+        if node.id in FUNCTIONS:
+            raise FormulaError(f"'{node.id}' es una función: use {node.id}(...)")
+        self.variables.add(node.id)
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name):
+            raise FormulaError("Solo se pueden llamar funciones por su nombre, p. ej. log(a)")
+        if node.func.id not in FUNCTIONS:
+            raise FormulaError(f"Función no permitida: {node.func.id}. Disponibles: {', '.join(FUNCTIONS)}")
+        if node.keywords:
+            raise FormulaError("Las funciones solo aceptan argumentos posicionales")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+
+class Formula:
+    """Fórmula validada y compilada; evaluate recibe {variable: serie}"""
+
+    def __init__(self, text):
+        text = (text or "").strip()
+        if not text:
+            raise FormulaError("Fórmula vacía")
+        if len(text) > MAX_FORMULA_LENGTH:
+            raise FormulaError(f"Fórmula demasiado larga (máx. {MAX_FORMULA_LENGTH} caracteres)")
+        try:
+            tree = ast.parse(text, mode="eval")
+        except SyntaxError as e:
+            raise FormulaError(f"Sintaxis inválida: {e.msg}") from None
+        validator = _Validator()
+        tree = ast.fix_missing_locations(validator.visit(tree))
+        self.text = text
+        self.variables = frozenset(validator.variables)
+        self._code = compile(tree, "<formula>", "eval")
+
+    def evaluate(self, inputs, base="a"):
+        """Evalúa vectorizado sobre series alineadas. Retorna una serie sin NaN.
+
+        Si la fórmula usa 'base', el resultado queda en las fechas de esa serie y las demás aportan
+        su último dato vigente (as-of), así 'a - b' entre una diaria y una mensual no se reduce a
+        las fechas comunes. Sin 'base' se usa la unión de fechas. Las funciones de ventana sobre
+        una variable alineada se calculan en sus propias fechas.
+        """
+        missing = self.variables - set(inputs)
+        if missing:
+            raise FormulaError(f"Variable sin serie asignada: {', '.join(sorted(missing))}")
+        used = {name: inputs[name] for name in sorted(self.variables)}
+        sources = {}
+        if len(used) > 1 and base in used:
+            for name, s in used.items():
+                if name != base:
+                    used[name] = as_of(s, used[base].index)
+                    sources[id(used[name])] = (used[name], s)
+        elif len(used) > 1:
+            aligned = merge_frames([s.rename(name) for name, s in used.items()])
+            used = {name: aligned[name] for name in used}
+        token = _as_of_sources.set(sources)
+        try:
+            with np.errstate(all="ignore"):
+                result = eval(self._code, {"__builtins__": {}}, {**FUNCTIONS, **used})
+        except FormulaError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise FormulaError(f"No se pudo evaluar: {e}") from None
+        finally:
+            _as_of_sources.reset(token)
+        if not isinstance(result, pd.Series):
+            raise FormulaError("La fórmula debe usar al menos una serie")
+        result = result.replace([np.inf, -np.inf], np.nan)
+        return result.dropna() if result.hasnans else result
+
+
+@functools.lru_cache(maxsize=256)
+def compile_formula(text):
+    """Formula compilada para 'text' (se parsea una sola vez por proceso). Lanza FormulaError"""
+    return Formula(text)
@@ -0,0 +1,87 @@
+"""Calculadora de variaciones del dólar (nominal, en pesos y real en UF), vectorizada e independiente de Streamlit."""
+import numpy as np
+import pandas as pd
+
+PERIOD_FREQS = {"Años": "Y", "Trimestres": "Q", "Meses": "M"}
+PERIOD_LABELS = {"Y": "Año", "Q": "Trimestre", "M": "Mes"}
+RESULT_COLUMNS = ["start", "end", "close", "clp", "nominal", "real"]
+
+
+def fx_frame(usd, uf=None, manual=None, today=None):
+    """Dólar observado con la UF vigente en cada fecha (as-of) y, si hay dato manual, el cierre de hoy.
+
+    El dato manual reemplaza (o agrega) la observación de hoy; la UF de hoy es la última conocida.
+    """
+    usd = usd.dropna()
+    if manual:
+        today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+        usd = pd.concat([usd[usd.index != today], pd.Series([float(manual)], index=pd.DatetimeIndex([today]).as_unit(usd.index.unit))])
+    frame = pd.DataFrame({"usd": usd.to_numpy(dtype=float)}, index=usd.index)
+    if uf is not None and not uf.empty:
+        uf = uf.dropna()
+        frame["uf"] = uf.reindex(frame.index.union(uf.index)).ffill().reindex(frame.index).to_numpy(dtype=float)
+    return frame
+
+
+def period_ends(index, freq):
+    """(PeriodIndex, posiciones) de la última observación de cada período en un índice ordenado, en una pasada"""
+    periods = index.to_period(freq)
+    ordinals = periods.asi8
+    is_last = np.append(ordinals[1:] != ordinals[:-1], True) if len(ordinals) else np.array([], dtype=bool)
+    return periods[is_last], np.flatnonzero(is_last)
+
+
+def changes(frame, start_pos, end_pos):
+    """Variaciones entre pares de filas (posiciones; -1 = sin dato) como operaciones sobre arreglos"""
+    start_pos, end_pos = np.asarray(start_pos), np.asarray(end_pos)
+    usd = np.append(frame["usd"].to_numpy(dtype=float), np.nan)  # la posición -1 apunta a este NaN
+    uf = np.append(frame["uf"].to_numpy(dtype=float), np.nan) if "uf" in frame else np.full(len(usd), np.nan)
+    dates = frame.index.append(pd.DatetimeIndex([pd.NaT]))
+    close, prev = usd[end_pos], usd[start_pos]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nominal = (close / prev - 1) * 100
+        real = ((close / uf[end_pos]) / (prev / uf[start_pos]) - 1) * 100
+    return pd.DataFrame({"start": dates[start_pos], "end": dates[end_pos], "close": close, "clp": close - prev,
+                         "nominal": nominal, "real": real}, columns=RESULT_COLUMNS)
+
+
+def period_changes(frame, freq, periods):
+    """Cierre de cada período pedido contra el cierre del período anterior ('Y', 'Q' o 'M')"""
+    ends, positions = period_ends(frame.index, freq)
+    wanted = pd.PeriodIndex(periods, freq=freq)
+    lookup = np.append(positions, -1)
+    end_pos = lookup[ends.get_indexer(wanted)]
+    start_pos = lookup[ends.get_indexer(wanted - 1)]
+    out = changes(frame, start_pos, end_pos)
+    out.index = wanted.astype(str)
+    return out
+
+
+def range_changes(frame, pairs):
+    """Variación entre fechas arbitrarias: se toma el último cierre disponible en o antes de cada fecha"""
+    starts = pd.DatetimeIndex([pd.Timestamp(a) for a, _ in pairs])
+    ends = pd.DatetimeIndex([pd.Timestamp(b) for _, b in pairs])
+    index = frame.index
+    start_pos = index.searchsorted(starts.as_unit(index.unit), side="right") - 1
+    end_pos = index.searchsorted(ends.as_unit(index.unit), side="right") - 1
+    out = changes(frame, start_pos, end_pos)
+    out.index = [f"{a:%d-%m-%Y} → {b:%d-%m-%Y}" for a, b in zip(starts, ends)]
+    return out
+
+
+def format_changes(result, has_uf):
+    """Tabla para mostrar: fechas dd-mm-aaaa, montos en $ y variaciones en %; sin dato queda 'N/A'"""
+    def money(values, signed=False):
+        text = pd.Series(values, index=result.index).map(lambda v: f"{'+' if signed and v > 0 else ''}${v:,.2f}")
+        return text.where(pd.notna(values), "N/A")
+
+    def pct(values):
+        return pd.Series(values, index=result.index).map("{:.2f}%".format).where(pd.notna(values), "N/A")
+
+    return pd.DataFrame({
+        "Fecha Ref.": result["end"].dt.strftime("%d-%m-%Y").fillna("N/A"),
+        "Cierre Nominal": money(result["close"].to_numpy()),
+        "Var. $ (CLP)": money(result["clp"].to_numpy(), signed=True),
+        "Var. Nominal %": pct(result["nominal"].to_numpy()),
+        "Var. Real (UF) %": pct(result["real"].to_numpy()) if has_uf else "Requiere UF",
+    }, index=result.index)
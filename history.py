@@ -0,0 +1,76 @@
+"""Tabla histórica de publicaciones (dato, anterior y fecha de publicación), vectorizada e independiente de Streamlit."""
+import numpy as np
+import pandas as pd
+
+from transforms import periods_per_year
+
+MONTHS_SHORT = np.array(["", "Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"], dtype=object)
+PERIOD_OFFSETS = {12: pd.DateOffset(months=1), 4: pd.DateOffset(months=3), 2: pd.DateOffset(months=6), 1: pd.DateOffset(years=1)}
+MAX_RELEASE_LAG = pd.Timedelta(days=120)  # más lejos que esto, la fecha no es la publicación del período
+
+
+def period_end(index):
+    """Primer día después del período de referencia de cada observación.
+
+    Mensuales y menores frecuencias vienen fechadas al inicio del período (FRED/BCCh); semanales y
+    diarias, en su último día, así que el período termina con la misma observación.
+    """
+    offset = PERIOD_OFFSETS.get(periods_per_year(index))
+    return index + offset if offset is not None else index + pd.Timedelta(days=1)
+
+
+def history_table(series, release_dates=()):
+    """Observaciones de la más reciente a la más antigua con el dato anterior y su publicación.
+
+    'published' es la primera fecha de publicación real (release_dates, ascendentes) desde el fin
+    del período; si las fechas no cubren el período queda NaT y se muestra una estimación.
+    """
+    series = series.dropna()
+    index = series.index
+    values = series.to_numpy(dtype=float)
+    previous = np.empty_like(values)
+    previous[:1] = np.nan
+    previous[1:] = values[:-1]
+    published = np.full(len(index), np.datetime64("NaT"), dtype="datetime64[ns]")
+    if len(release_dates) and len(index):
+        releases = pd.DatetimeIndex(pd.to_datetime(list(release_dates))).as_unit("ns").to_numpy()
+        ends = period_end(index).as_unit("ns").to_numpy()
+        pos = np.searchsorted(releases, ends, side="left")
+        candidate = releases[np.minimum(pos, len(releases) - 1)]
+        # Solo cuenta si la lista ya cubría el período (hay una publicación anterior a su cierre)
+        found = (pos > 0) & (pos < len(releases)) & (candidate - ends <= MAX_RELEASE_LAG.to_timedelta64())
+        published[found] = candidate[found]
+    table = pd.DataFrame({"actual": values, "previous": previous, "published": published}, index=index)
+    table = table.iloc[1:] if len(table) > 1 else table  # la primera observación no tiene dato anterior
+    return table.iloc[::-1]
+
+
+def _labels(dates, with_day=False):
+    text = MONTHS_SHORT[dates.month] + " " + dates.year.astype(str).to_numpy(dtype=object)
+    return (dates.day.astype(str).to_numpy(dtype=object) + " " + text) if with_day else text
+
+
+def _numbers(values, is_pct):
+    """Dos decimales sin '.00' sobrante y '%' si corresponde; vacío para NaN"""
+    text = pd.Series(np.char.mod("%.2f", values)).str.removesuffix(".00")
+    if is_pct:
+        text = text + "%"
+    return text.where(~np.isnan(values), "").to_numpy(dtype=object)
+
+
+def format_history_table(table, is_pct, start=0, stop=None):
+    """Filas [start:stop) de history_table listas para mostrar (solo se formatea la página visible)"""
+    page = table.iloc[start:stop]
+    index = page.index
+    with_day = periods_per_year(table.index[::-1]) > 12 if len(table) > 1 else False
+    published = pd.DatetimeIndex(page["published"])
+    real = published.notna()
+    estimated = index + pd.DateOffset(months=1)
+    publication = np.where(real, published.strftime("%d-%m-%Y").to_numpy(dtype=object),
+                           _labels(estimated) + " (est.)")
+    return pd.DataFrame({
+        "Referencia": _labels(index, with_day),
+        "Publicación": publication,
+        "Actual": _numbers(page["actual"].to_numpy(), is_pct),
+        "Anterior": _numbers(page["previous"].to_numpy(), is_pct),
+    })
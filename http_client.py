@@ -0,0 +1,91 @@
+"""Cliente HTTP compartido: pool de conexiones por host, reintentos con backoff y timeouts configurables."""
+import os
+import time
+import random
+import threading
+from http import cookiejar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.environ.get("XTB_HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("XTB_HTTP_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.environ.get("XTB_HTTP_RETRIES", "3"))
+BACKOFF_BASE = 0.5  # segundos
+BACKOFF_MAX = 8.0
+POOL_HOSTS = 8
+POOL_MAXSIZE = int(os.environ.get("XTB_HTTP_POOL", "16"))  # conexiones keep-alive por host
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class _NoCookies(cookiejar.DefaultCookiePolicy):
+    """La sesión se comparte entre hilos y usuarios: no guarda cookies de ninguna respuesta"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+def get_session():
+    """Sesión requests única del proceso (se crea la primera vez que se pide)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.cookies.set_policy(_NoCookies())
+            _session = session
+        return _session
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Espera antes del reintento 'attempt' (0, 1, ...): exponencial con jitter completo, o Retry-After si viene"""
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def public_url(url):
+    """URL sin query string: las claves de FRED y BCCh viajan como parámetros y no deben llegar a la UI"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+def raise_for_status(res):
+    """Como Response.raise_for_status, pero el mensaje no incluye los parámetros de la URL"""
+    if res.status_code >= 400:
+        raise requests.HTTPError(f"HTTP {res.status_code} {res.reason} en {public_url(res.url)}", response=res)
+
+
+def get(url, params=None, timeout=None, retries=MAX_RETRIES):
+    """GET por la sesión compartida con reintentos en 429/5xx y errores de conexión.
+
+    timeout puede ser None (valores por defecto), un número (timeout de lectura) o una tupla
+    (conexión, lectura). Retorna la última respuesta; el llamador decide si es un error.
+    Los errores de conexión que agotan los reintentos se relanzan sin parámetros en el mensaje.
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (CONNECT_TIMEOUT, timeout)
+    session = get_session()
+    for attempt in range(retries + 1):
+        try:
+            res = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise type(e)(f"{type(e).__name__} en {public_url(url)}") from None
+            time.sleep(backoff_delay(attempt))
+            continue
+        if res.status_code not in RETRY_STATUS or attempt == retries:
+            return res
+        time.sleep(backoff_delay(attempt, res.headers.get("Retry-After")))
+    return res
@@ -0,0 +1,100 @@
+"""Almacén local de series: un archivo Parquet por serie más un manifiesto JSON."""
+import os
+import json
+import threading
+import datetime
+
+import pandas as pd
+
+STORE_DIR = os.environ.get("XTB_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".series_store"))
+MANIFEST_NAME = "manifest.json"
+
+
+def series_key(source, series_id, units="lin"):
+    """Clave estable de una serie en el almacén: (fuente, id, unidades)"""
+    return f"{source}__{series_id}__{units or 'lin'}"
+
+
+def upsert_series(stored, fresh):
+    """Une la serie guardada con observaciones nuevas; las nuevas pisan a las guardadas (revisiones)"""
+    if stored is None or stored.empty:
+        return fresh.sort_index()
+    if fresh is None or fresh.empty:
+        return stored
+    fresh = fresh.sort_index()
+    fresh = fresh[~fresh.index.duplicated(keep='last')]
+    return pd.concat([stored[stored.index < fresh.index[0]], fresh])
+
+
+class SeriesStore:
+    """Series en disco con manifiesto de última observación y última descarga.
+
+    Si el directorio no se puede usar (sistema de archivos de solo lectura, sin pyarrow),
+    el almacén queda deshabilitado y las lecturas devuelven None para forzar descarga completa.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        try:
+            import pyarrow  # noqa: F401
+            os.makedirs(root, exist_ok=True)
+            self.enabled = True
+        except (ImportError, OSError):
+            self.enabled = False
+        self._manifest = self._load_manifest() if self.enabled else {}
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.parquet")
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        path = os.path.join(self.root, MANIFEST_NAME)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    def info(self, key):
+        """Entrada del manifiesto ({last_obs, last_fetch, rows}) o {} si la serie no está guardada"""
+        with self._lock:
+            return dict(self._manifest.get(key, {}))
+
+    def read(self, key):
+        """Lee la serie guardada o None si no existe / no se puede leer"""
+        if not self.enabled or key not in self._manifest:
+            return None
+        try:
+            df = pd.read_parquet(self._path(key))
+        except Exception:
+            return None
+        series = df.iloc[:, 0]
+        series.index = pd.DatetimeIndex(series.index)
+        return series
+
+    def write(self, key, series, **meta):
+        """Guarda la serie completa (escritura atómica) y actualiza el manifiesto"""
+        if not self.enabled or series is None or series.empty:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            series.rename("value").to_frame().to_parquet(tmp)
+            os.replace(tmp, path)
+            with self._lock:
+                self._manifest[key] = {
+                    **self._manifest.get(key, {}), **meta,
+                    "last_obs": series.index[-1].strftime("%Y-%m-%d"),
+                    "last_fetch": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "rows": int(len(series)),
+                }
+                self._save_manifest()
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,176 @@
+"""Pruebas del motor de fórmulas: lista blanca del sandbox, evaluación y alineación de fechas.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+import formulas  # noqa: E402
+from formulas import Formula, FormulaError, compile_formula  # noqa: E402
+
+
+@pytest.fixture
+def daily():
+    index = pd.bdate_range("2024-01-01", "2024-06-28", name="Fecha")
+    return pd.Series(np.linspace(-5.0, 5.0, len(index)), index=index)
+
+
+@pytest.fixture
+def monthly():
+    index = pd.date_range("2023-12-01", "2024-06-01", freq="MS", name="Fecha")
+    return pd.Series(np.arange(1.0, len(index) + 1), index=index)
+
+
+# --- RECHAZOS ---
+@pytest.mark.parametrize("text", [
+    "a.__class__",
+    "a.values",
+    "a[0]",
+    "a[1:3]",
+    "lambda: a",
+    "(lambda x: x)(a)",
+    "[x for x in a]",
+    "sum(x for x in a)",
+    "{x: 1 for x in a}",
+    "a if a else b",
+    "a < b",
+    "'texto'",
+    "True + a",
+])
+def test_rejects_constructs_outside_whitelist(text):
+    with pytest.raises(FormulaError):
+        Formula(text)
+
+
+@pytest.mark.parametrize("text", [
+    "__import__('os')",
+    "eval('1')",
+    "open('x')",
+    "getattr(a, 'values')",
+    "max(a, b)",
+])
+def test_rejects_calls_to_non_whitelisted_names(text):
+    with pytest.raises(FormulaError, match="no permitida"):
+        Formula(text)
+
+
+def test_rejects_method_calls():
+    with pytest.raises(FormulaError, match="por su nombre"):
+        Formula("a.sum()")
+
+
+def test_rejects_keyword_arguments_and_bare_functions():
+    with pytest.raises(FormulaError, match="posicionales"):
+        Formula("rolling_mean(a, n=3)")
+    with pytest.raises(FormulaError, match="es una función"):
+        Formula("a + log")
+
+
+@pytest.mark.parametrize("text", ["a * 2 ** 100000", "a + 9 ** 9 ** 9", "a * 10.0 ** 400"])
+def test_oversized_powers_fail_fast(daily, text):
+    with pytest.raises(FormulaError, match="No se pudo evaluar"):
+        Formula(text).evaluate({"a": daily})
+
+
+def test_rejects_empty_long_and_invalid_text():
+    with pytest.raises(FormulaError, match="vacía"):
+        Formula("  ")
+    with pytest.raises(FormulaError, match="larga"):
+        Formula("a + " * 60 + "a")
+    with pytest.raises(FormulaError, match="Sintaxis"):
+        Formula("a +")
+
+
+def test_requires_inputs_and_a_series(daily):
+    with pytest.raises(FormulaError, match="sin serie asignada: b"):
+        Formula("a - b").evaluate({"a": daily})
+    with pytest.raises(FormulaError, match="al menos una serie"):
+        Formula("1 + 2").evaluate({})
+
+
+@pytest.mark.parametrize("text", ["rolling_mean(a, 0)", "rolling_mean(a, 1.5)", f"lag(a, {formulas.MAX_WINDOW + 1})", "diff(a, a)"])
+def test_rejects_invalid_windows(daily, text):
+    with pytest.raises(FormulaError, match="ventana"):
+        Formula(text).evaluate({"a": daily})
+
+
+def test_builtins_are_not_reachable(daily):
+    formula = Formula("a")
+    assert "__import__" not in formula.variables
+    with pytest.raises(FormulaError):
+        Formula("__builtins__").evaluate({"a": daily})
+
+
+# --- EVALUACIÓN Y ALINEACIÓN ---
+def test_difference_keeps_base_dates_with_as_of_values(daily, monthly):
+    result = Formula("a - b").evaluate({"a": daily, "b": monthly})
+    assert result.index.equals(daily.index)
+    expected = daily - monthly.reindex(daily.index, method="ffill")
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_as_of_does_not_extend_past_last_period(daily, monthly):
+    short = monthly[monthly.index <= "2024-03-01"]
+    result = Formula("a - b").evaluate({"a": daily, "b": short})
+    assert result.index[0] == daily.index[0]
+    assert result.index[-1] < pd.Timestamp("2024-04-02")
+    assert result.index.isin(daily.index).all()
+
+
+def test_without_base_uses_union_of_dates(daily, monthly):
+    result = Formula("x - y").evaluate({"x": daily, "y": monthly})
+    assert result.index.equals(daily.index.intersection(monthly.index))
+    np.testing.assert_allclose(result.to_numpy(), (daily - monthly).dropna().to_numpy())
+
+
+def test_abs_and_arithmetic(daily):
+    pd.testing.assert_series_equal(Formula("abs(a)").evaluate({"a": daily}), daily.abs().where(daily != 0, 0.0))
+    pd.testing.assert_series_equal(Formula("-a * 2 + 1").evaluate({"a": daily}), -daily * 2 + 1)
+
+
+def test_division_by_zero_is_dropped(daily):
+    result = Formula("1 / a").evaluate({"a": daily})
+    assert np.isfinite(result).all()
+    assert len(result) == (daily != 0).sum()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("rolling_mean(a, 3)", lambda s: s.rolling(3).mean()),
+    ("diff(a, 2)", lambda s: s.diff(2)),
+    ("diff(a)", lambda s: s.diff()),
+    ("lag(a, 5)", lambda s: s.shift(5)),
+])
+def test_window_helpers(daily, text, expected):
+    pd.testing.assert_series_equal(Formula(text).evaluate({"a": daily}), expected(daily).dropna())
+
+
+def test_window_helpers_use_native_observations(monthly):
+    # Con los NaN de la alineación, la ventana cuenta observaciones de la serie y no días del índice
+    padded = monthly.reindex(pd.date_range(monthly.index[0], monthly.index[-1], freq="D"))
+    out = formulas.rolling_mean(padded, 2)
+    assert out.index.equals(padded.index)
+    pd.testing.assert_series_equal(out.dropna(), monthly.rolling(2).mean().dropna(), check_freq=False, check_names=False)
+
+
+def test_rolling_mean_on_secondary_series_is_aligned(daily, monthly):
+    result = Formula("a - rolling_mean(b, 2)").evaluate({"a": daily, "b": monthly})
+    expected = daily - monthly.rolling(2).mean().reindex(daily.index, method="ffill")
+    pd.testing.assert_series_equal(result, expected.dropna(), check_names=False)
+
+
+def test_diff_on_secondary_series_uses_its_own_periods(daily, monthly):
+    # Sobre los valores arrastrados a diario, diff() daría casi solo ceros
+    result = Formula("diff(b) + a * 0").evaluate({"a": daily, "b": monthly})
+    assert (result == 1.0).all()
+    assert result.index.equals(daily.index)
+
+
+def test_compile_formula_is_cached():
+    assert compile_formula("a + 1") is compile_formula("a + 1")
+    assert compile_formula("a + 1").variables == frozenset({"a"})
@@ -0,0 +1,71 @@
+"""Pruebas de la tabla histórica: asignación de la fecha de publicación real a cada período.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from history import history_table, format_history_table  # noqa: E402
+
+
+def monthly(start="2023-01-01", periods=12):
+    index = pd.date_range(start, periods=periods, freq="MS")
+    return pd.Series(np.arange(1.0, periods + 1), index=index)
+
+
+def releases(series, day=12):
+    """Una publicación el día 'day' del mes siguiente a cada período, como un IPC"""
+    return [(d + pd.DateOffset(months=1)).replace(day=day).date() for d in series.index]
+
+
+def test_each_period_gets_its_own_release():
+    series = monthly()
+    table = history_table(series, releases(series))
+    assert table.index[0] == series.index[-1]  # de la más reciente a la más antigua
+    expected = pd.DatetimeIndex([d + pd.DateOffset(months=1, days=11) for d in table.index])
+    assert pd.DatetimeIndex(table["published"]).equals(expected)
+    assert (table["previous"].to_numpy() == table["actual"].to_numpy() - 1).all()
+
+
+def test_release_before_period_end_is_not_used():
+    series = monthly()
+    # Publicación anticipada el último día del mismo mes: no puede ser la del período
+    dates = [(d + pd.offsets.MonthEnd(0)).date() for d in series.index]
+    table = history_table(series, dates)
+    expected = [(d + pd.DateOffset(months=1) + pd.offsets.MonthEnd(0)) for d in table.index]
+    published = pd.DatetimeIndex(table["published"])
+    assert published[1:].equals(pd.DatetimeIndex(expected[1:]))
+    assert pd.isna(published[0])  # el último período aún no tiene publicación en la lista
+
+
+def test_calendar_not_covering_old_periods_falls_back_to_estimate():
+    series = monthly()
+    recent = [d for d in releases(series) if d >= datetime.date(2023, 9, 1)]
+    table = history_table(series, recent)
+    published = pd.Series(pd.DatetimeIndex(table["published"]), index=table.index)
+    # Solo cuentan los períodos cuyo cierre ya está cubierto por la lista (hay una publicación anterior):
+    # agosto cierra el 1 de septiembre y la lista parte el 12, así que también queda estimado
+    assert published[published.index >= "2023-09-01"].notna().all()
+    assert published[published.index < "2023-09-01"].isna().all()
+    page = format_history_table(table, is_pct=False)
+    assert page["Publicación"].str.endswith("(est.)").sum() == published.isna().sum()
+
+
+def test_release_too_far_after_period_is_rejected():
+    series = monthly(periods=3)
+    dates = [datetime.date(2022, 12, 1), datetime.date(2023, 12, 1)]
+    table = history_table(series, dates)
+    assert pd.DatetimeIndex(table["published"]).isna().all()
+
+
+def test_without_calendar_every_row_is_estimated():
+    table = history_table(monthly(periods=4))
+    page = format_history_table(table, is_pct=True)
+    assert page["Publicación"].str.endswith("(est.)").all()
+    assert page["Actual"].str.endswith("%").all()
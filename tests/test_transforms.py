@@ -0,0 +1,46 @@
+"""Pruebas de las transformaciones de unidades: comparación contra el año anterior por frecuencia.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from transforms import apply_units  # noqa: E402
+
+
+def synthetic(freq, periods, unit="ns", start="2015-01-01"):
+    rng = np.random.default_rng(0)
+    index = pd.date_range(start, periods=periods, freq=freq, unit=unit)
+    return pd.Series(100 + rng.standard_normal(periods).cumsum(), index=index)
+
+
+@pytest.mark.parametrize("unit", ["ns", "us", "s"])
+@pytest.mark.parametrize("freq, periods_per_year", [("W-SAT", 52), ("W-FRI", 52), ("MS", 12), ("QS", 4)])
+def test_pc1_and_ch1_match_fixed_lag(freq, periods_per_year, unit):
+    # Semanal: fecha - 1 año cae 1-2 días después del dato de hace 52 semanas, no en el de hace 53
+    series = synthetic(freq, 400, unit)
+    pd.testing.assert_series_equal(apply_units(series, "pc1"), series.pct_change(periods_per_year) * 100)
+    pd.testing.assert_series_equal(apply_units(series, "ch1"), series.diff(periods_per_year))
+
+
+def test_pc1_yearly():
+    series = synthetic("YS", 60, start="1950-01-01")
+    pd.testing.assert_series_equal(apply_units(series, "pc1"), series.pct_change() * 100)
+
+
+def test_pc1_skips_gaps_instead_of_older_data():
+    series = synthetic("MS", 60)
+    gapped = series.drop(series.index[20:30])  # sin datos 2016-09 a 2017-06
+    out = apply_units(gapped, "pc1")
+    # Hasta 1,5 espaciados atrás se acepta el dato anterior; más lejos queda NaN
+    assert out["2017-09-01"] == pytest.approx((series["2017-09-01"] / series["2016-08-01"] - 1) * 100)
+    assert out["2017-10-01":"2018-06-01"].isna().all()
+    expected = (gapped / series.shift(12).reindex(gapped.index) - 1) * 100
+    complete = ~(gapped.index - pd.DateOffset(years=1)).isin(series.index[20:30])
+    pd.testing.assert_series_equal(out[complete], expected[complete])
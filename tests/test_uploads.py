@@ -0,0 +1,58 @@
+"""Pruebas de la ingesta de archivos propios: fechas día primero, coma decimal y filas descartadas.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from uploads import UploadError, parse_upload  # noqa: E402
+
+
+def frame(text):
+    return parse_upload(text.encode("utf-8"), "datos.csv")
+
+
+def test_day_first_dates_keep_every_row():
+    parsed = frame("Fecha,Valor\n01/02/2024,1.5\n15/02/2024,2\n31/12/2024,3\n")
+    df = parsed.frames[None]
+    assert list(df.index) == list(pd.to_datetime(["2024-02-01", "2024-02-15", "2024-12-31"]))
+    assert df["Valor"].tolist() == [1.5, 2.0, 3.0]
+    assert parsed.dropped == 0
+
+
+def test_chilean_export_semicolon_and_decimal_comma():
+    parsed = frame("Fecha;Dólar;IPC\n02-01-2024;884,5;1.234,5\n03-01-2024;890,12;1.240,0\n")
+    df = parsed.frames[None]
+    assert list(df.index) == list(pd.to_datetime(["2024-01-02", "2024-01-03"]))
+    assert df["Dólar"].tolist() == [884.5, 890.12]
+    assert df["IPC"].tolist() == [1234.5, 1240.0]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("date,v\n2024-01-02,1\n2024-01-03,2\n", ["2024-01-02", "2024-01-03"]),
+    ("date,v\n02/15/2024,1\n03/20/2024,2\n", ["2024-02-15", "2024-03-20"]),
+])
+def test_iso_and_month_first_files_still_parse(text, expected):
+    assert list(frame(text).frames[None].index) == list(pd.to_datetime(expected))
+
+
+def test_thousands_comma_with_decimal_point():
+    df = frame('date,v\n2024-01-02,"1,234.5"\n2024-01-03,"2,000.25"\n').frames[None]
+    assert df["v"].tolist() == [1234.5, 2000.25]
+
+
+def test_unreadable_dates_are_reported():
+    parsed = frame("Fecha;V\n02-01-2024;1\nsin fecha;2\n03-01-2024;3\n")
+    assert len(parsed.frames[None]) == 2
+    assert parsed.dropped == 1
+    assert "1 fila descartada" in parsed.summary()
+
+
+def test_no_series_is_an_error():
+    with pytest.raises(UploadError):
+        frame("Fecha;Nota\n02-01-2024;hola\n")
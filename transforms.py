@@ -0,0 +1,169 @@
+"""Transformaciones de series para el dashboard (unidades estilo FRED), vectorizadas e independientes de Streamlit."""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+UNIT_CODES = ("lin", "chg", "ch1", "pch", "pc1", "pca", "cch", "cca", "log")
+
+# Observaciones por año según el espaciado típico (días) entre fechas: (tope del espaciado, n por año)
+PERIODS_PER_YEAR = ((1.5, None), (8, 52), (35, 12), (100, 4), (200, 2))
+BUSINESS_DAYS_PER_YEAR = 260
+CALENDAR_DAYS_PER_YEAR = 365
+YEAR_AGO_MIN_TOLERANCE = pd.Timedelta(days=7)
+TRANSFORM_CACHE_ENTRIES = int(os.environ.get("XTB_TRANSFORM_CACHE_ENTRIES", "256"))
+TRANSFORM_CACHE_MB = float(os.environ.get("XTB_TRANSFORM_CACHE_MB", "128"))
+
+
+def median_step(index):
+    """Espaciado mediano entre fechas consecutivas"""
+    if len(index) < 2:
+        return None
+    return pd.Timedelta(int(np.median(np.diff(index.asi8))), unit=index.unit)
+
+
+def periods_per_year(index):
+    """Observaciones por año deducidas del índice: 260 (diaria hábil), 365, 52, 12, 4, 2 o 1"""
+    step = median_step(index)
+    if step is None:
+        return 1
+    days = step / pd.Timedelta(days=1)
+    for limit, n in PERIODS_PER_YEAR:
+        if days <= limit:
+            if n is None:
+                weekends = np.count_nonzero(index.dayofweek >= 5)
+                return CALENDAR_DAYS_PER_YEAR if weekends > len(index) * 0.05 else BUSINESS_DAYS_PER_YEAR
+            return n
+    return 1
+
+
+def year_ago_values(series):
+    """Valor de la observación más cercana a un año calendario antes de cada fecha.
+
+    En semanales, fecha - 1 año cae uno o dos días después del dato de hace 52 semanas: la última
+    observación <= esa fecha sería la de hace 53. Por eso se toma la más cercana: la posterior solo
+    si queda a menos de medio espaciado, y la anterior si no está más lejos que 1,5 espaciados
+    (mínimo 7 días), para no comparar contra datos de años anteriores cuando hay huecos.
+    """
+    index = series.index
+    stamps = index.to_numpy()
+    values = series.to_numpy(dtype=float)
+    target = (index - pd.DateOffset(years=1)).as_unit(index.unit).to_numpy()
+    before = np.searchsorted(stamps, target, side="right") - 1
+    after = before + 1
+    step = median_step(index)
+    tolerance = max(step * 1.5, YEAR_AGO_MIN_TOLERANCE) if step is not None else YEAR_AGO_MIN_TOLERANCE
+    half_step = (step / 2 if step is not None else pd.Timedelta(0)).to_timedelta64()
+    has_before, has_after = before >= 0, after < len(stamps)
+    before, after = np.where(has_before, before, 0), np.where(has_after, after, 0)
+    gap_before, gap_after = target - stamps[before], stamps[after] - target
+    use_after = has_after & (gap_after <= half_step) & (~has_before | (gap_after < gap_before))
+    use_before = ~use_after & has_before & (gap_before <= tolerance.to_timedelta64())
+    return np.where(use_after, values[after], np.where(use_before, values[before], np.nan))
+
+
+def _previous(values):
+    out = np.empty_like(values)
+    out[:1] = np.nan
+    out[1:] = values[:-1]
+    return out
+
+
+def _ratio(num, den):
+    """num/den con NaN donde el denominador es 0 o falta"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, num / den, np.nan)
+
+
+def _log(values):
+    """Logaritmo natural con NaN para valores no positivos"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(values > 0, np.log(np.where(values > 0, values, 1.0)), np.nan)
+
+
+def apply_units(series, units):
+    """Transformación de unidades estilo FRED sobre la frecuencia real de la serie.
+
+    chg/pch/pca/cch/cca comparan contra la observación anterior; ch1/pc1 contra el valor de un año
+    calendario antes; pca/cca anualizan con las observaciones por año del índice.
+    """
+    if units in (None, "lin") or series.empty:
+        return series
+    if units not in UNIT_CODES:
+        return series
+    values = series.to_numpy(dtype=float)
+    if units == "log":
+        out = _log(values)
+    elif units in ("ch1", "pc1"):
+        year_ago = year_ago_values(series)
+        out = values - year_ago if units == "ch1" else (_ratio(values, year_ago) - 1) * 100
+    else:
+        prev = _previous(values)
+        if units == "chg":
+            out = values - prev
+        elif units == "pch":
+            out = (_ratio(values, prev) - 1) * 100
+        elif units == "pca":
+            with np.errstate(over="ignore", invalid="ignore"):
+                out = (_ratio(values, prev) ** periods_per_year(series.index) - 1) * 100
+        else:
+            log_change = _log(_ratio(values, prev)) * 100
+            out = log_change * periods_per_year(series.index) if units == "cca" else log_change
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+def _nbytes(value):
+    if not hasattr(value, "memory_usage"):
+        return sys.getsizeof(value)
+    usage = value.memory_usage(index=True)
+    return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+
+
+class TransformCache:
+    """LRU de resultados derivados (series transformadas, pares alineados) compartido por las sesiones.
+
+    La clave debe incluir el token de la serie de origen (fuente, id, versión de datos) y los
+    parámetros de la transformación, así un cambio cosmético no recalcula nada y el mismo 'pc1'
+    de CPIAUCSL se calcula una vez por proceso. Acotado por entradas y por megabytes.
+    Los valores se comparten: quien los recibe no debe modificarlos. 'sizeof' estima los bytes de
+    un valor (por defecto, memory_usage de pandas).
+    """
+
+    def __init__(self, max_entries=TRANSFORM_CACHE_ENTRIES, max_mb=TRANSFORM_CACHE_MB, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 2 ** 20)
+        self._sizeof = sizeof or _nbytes
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Valor memoizado para 'key' o compute() si no está. key=None no se cachea"""
+        if key is None:
+            return compute()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        value = compute()
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    _, (_, old_size) = self._entries.popitem(last=False)
+                    self._bytes -= old_size
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "mb": round(self._bytes / 2 ** 20, 2), "hits": self.hits, "misses": self.misses}
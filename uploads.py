@@ -0,0 +1,328 @@
+"""Ingesta de archivos propios (Excel, CSV, Parquet) identificados por contenido, independiente de Streamlit."""
+import io
+import os
+import time
+import shutil
+import hashlib
+import weakref
+import warnings
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+UPLOAD_TYPES = ("xlsx", "csv", "parquet")
+CSV_SEPARATORS = (";", "\t", "|")  # si la cabecera trae uno de estos, se usa en vez de ','
+SHEET_MAX_WORKERS = int(os.environ.get("XTB_SHEET_WORKERS", "4"))
+USER_STORE_ENTRIES = int(os.environ.get("XTB_USER_STORE_ENTRIES", "32"))
+USER_STORE_MB = float(os.environ.get("XTB_USER_STORE_MB", "256"))
+USER_SPILL_DIR = os.environ.get("XTB_USER_SPILL_DIR", "")  # vacío: sin volcado a disco
+
+
+class UploadError(ValueError):
+    pass
+
+
+def content_hash(data):
+    """Identidad del archivo: sha256 del contenido (16 hex), no el nombre"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def excel_engine():
+    """'calamine' (lector en Rust, mucho más rápido) si python-calamine está instalado; si no, 'openpyxl'"""
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+
+def parse_dates(values):
+    """Fechas día primero (dd-mm-aaaa, como exporta el BCCh); ISO y fechas de Excel se leen igual.
+
+    Si la lectura mes primero reconoce más filas (archivo en formato EE.UU.), se usa esa.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # aviso de dayfirst con fechas ISO
+        dates = pd.to_datetime(values, dayfirst=True, errors="coerce")
+        if dates.isna().any():
+            month_first = pd.to_datetime(values, errors="coerce")
+            if month_first.notna().sum() > dates.notna().sum():
+                return month_first
+    return dates
+
+
+def parse_numbers(values):
+    """to_numeric de celdas de texto aceptando coma decimal ('1.234,5' y '1,5') y coma de miles ('1,234.5')"""
+    text = pd.Series(values, dtype="string").str.strip()
+    last_comma, last_dot = text.str.rfind(","), text.str.rfind(".")
+    decimal_comma = (last_comma > last_dot).fillna(False)
+    thousands_comma = ((last_comma >= 0) & ~decimal_comma).fillna(False)
+    text = text.mask(decimal_comma, text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    text = text.mask(thousands_comma, text.str.replace(",", "", regex=False))
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def normalize_frame(df):
+    """Primera columna como fechas (índice ordenado) y el resto numérico; None si no queda ninguna serie.
+
+    Las columnas no numéricas se convierten en un solo parse_numbers sobre todos sus valores. Las
+    filas con algo en la columna de fechas que no se pudo leer quedan contadas en attrs['dropped_rows'].
+    """
+    if isinstance(df.index, pd.DatetimeIndex):
+        df = df.reset_index()  # Parquet escrito desde pandas trae las fechas en el índice
+    if df.shape[1] < 2:
+        return None
+    first = df.iloc[:, 0]
+    dates = parse_dates(first)
+    valid = dates.notna().to_numpy()
+    dropped = int(np.count_nonzero(~valid & first.notna().to_numpy()))
+    df = df.iloc[valid, 1:].set_axis(pd.DatetimeIndex(dates[valid], name=str(df.columns[0])), axis=0)
+    df.columns = df.columns.map(str)
+    text = [c for c, dtype in df.dtypes.items() if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)]
+    if text:
+        values = parse_numbers(df[text].to_numpy(dtype=object).ravel())
+        df[text] = values.reshape(len(df), len(text))
+    df = df.dropna(axis=1, how="all")
+    if df.empty:
+        return None
+    df = df if df.index.is_monotonic_increasing else df.sort_index(kind="stable")
+    df.attrs["dropped_rows"] = dropped
+    return df
+
+
+def csv_separator(data):
+    """';', tabulador o '|' si aparecen en la primera línea (exportaciones en locale es-CL usan ';'); si no ','"""
+    header = data[:data.find(b"\n")] if b"\n" in data[:65536] else data[:65536]
+    return next((sep for sep in CSV_SEPARATORS if sep.encode() in header), ",")
+
+
+def _read_csv(data):
+    """Lector de pyarrow (multihilo) con el separador de la cabecera; si falla, el lector que lo detecta.
+
+    Con ';' los números suelen venir con coma decimal: quedan como texto y los convierte normalize_frame.
+    """
+    sep = csv_separator(data)
+    try:
+        df = pd.read_csv(io.BytesIO(data), sep=sep, engine="pyarrow")
+        if df.shape[1] > 1:
+            return df
+    except (ImportError, ValueError):
+        pass
+    return pd.read_csv(io.BytesIO(data), sep=None, engine="python")
+
+
+def _read_excel(data, engine, max_workers):
+    """{hoja: DataFrame}; con varias hojas cada una se lee en paralelo sobre su propio buffer"""
+    with pd.ExcelFile(io.BytesIO(data), engine=engine) as book:
+        sheets = book.sheet_names
+        if len(sheets) == 1:
+            return {sheets[0]: book.parse(sheets[0])}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sheets))) as pool:
+        frames = pool.map(lambda sheet: pd.read_excel(io.BytesIO(data), sheet_name=sheet, engine=engine), sheets)
+        return dict(zip(sheets, frames))
+
+
+class ParsedUpload:
+    """Resultado de la ingesta: {hoja: DataFrame normalizado} (hoja None en CSV/Parquet) más tiempo y memoria"""
+
+    def __init__(self, frames, content_hash, seconds, engine):
+        self.frames = frames
+        self.content_hash = content_hash
+        self.seconds = seconds
+        self.engine = engine
+        self.nbytes = sum(int(df.memory_usage(index=True).sum()) for df in frames.values())
+        self.rows = max(len(df) for df in frames.values())
+        self.series = sum(df.shape[1] for df in frames.values())
+        self.dropped = sum(df.attrs.get("dropped_rows", 0) for df in frames.values())
+
+    def summary(self):
+        text = f"{self.series} series, {self.rows:,} filas, {self.seconds:.2f}s, {self.nbytes / 2 ** 20:.1f} MB ({self.engine})"
+        if self.dropped:
+            text += f" ⚠️ {self.dropped:,} fila{'s' if self.dropped > 1 else ''} descartada{'s' if self.dropped > 1 else ''} por fecha ilegible"
+        return text
+
+
+def parse_upload(data, filename, max_workers=SHEET_MAX_WORKERS):
+    """Lee y normaliza un archivo subido según su extensión. Lanza UploadError si no trae series utilizables"""
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    t0 = time.perf_counter()
+    key = content_hash(data)
+    if ext == "csv":
+        raw, engine = {None: _read_csv(data)}, "csv"
+    elif ext == "parquet":
+        raw, engine = {None: pd.read_parquet(io.BytesIO(data))}, "parquet"
+    elif ext == "xlsx":
+        engine = excel_engine()
+        raw = _read_excel(data, engine, max_workers)
+    else:
+        raise UploadError(f"Formato no soportado: .{ext} (use {', '.join(UPLOAD_TYPES)})")
+    frames = {}
+    for sheet, df in raw.items():
+        df = normalize_frame(df)
+        if df is not None:
+            df.attrs["content_hash"] = key if sheet is None else f"{key}/{sheet}"
+            frames[sheet] = df
+    if not frames:
+        raise UploadError("No se encontró una columna de fechas con series numéricas")
+    return ParsedUpload(frames, key, time.perf_counter() - t0, engine)
+
+
+def _write_arrow(df, path):
+    """Hoja en formato Arrow IPC sin comprimir (mapeable); los NaN se guardan como NaN para leer sin copiar"""
+    import pyarrow as pa
+    columns = {"__index__": pa.array(df.index.to_numpy())}
+    columns.update({c: pa.array(df[c].to_numpy(), from_pandas=False) for c in df.columns})
+    table = pa.table(columns)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_arrow(path, attrs):
+    """Hoja volcada, leída con memory map: las columnas numéricas quedan respaldadas por el archivo"""
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    df = table.to_pandas(split_blocks=True).set_index("__index__")
+    attrs = dict(attrs)
+    df.index.name = attrs.pop("index_name", None)
+    df.attrs.update(attrs)
+    return df
+
+
+class UserDataHandle:
+    """Referencia de una sesión a un archivo del almacén; se libera con release() o al recolectarse junto con la sesión"""
+
+    def __init__(self, store, key):
+        self.key = key
+        self._store = store
+        self._finalizer = weakref.finalize(self, store.release, key)
+
+    def frames(self):
+        return self._store.frames(self.key)
+
+    def summary(self):
+        return self._store.summary(self.key)
+
+    def release(self):
+        self._finalizer()
+
+
+class UserDataStore:
+    """Archivos propios compartidos por todas las sesiones, una sola copia por hash de contenido.
+
+    Las sesiones guardan UserDataHandle (contador de referencias por archivo). Sobre el tope de
+    entradas o megabytes se descartan primero los archivos sin referencias (LRU); si aún sobra y
+    hay spill_dir, los referenciados menos usados se vuelcan a Arrow en disco y se leen con memory
+    map. Sin spill_dir, lo referenciado nunca se descarta (el tope es blando).
+    """
+
+    def __init__(self, max_entries=USER_STORE_ENTRIES, max_mb=USER_STORE_MB, spill_dir=USER_SPILL_DIR):
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 2 ** 20)
+        self.spill_dir = spill_dir or None
+        if self.spill_dir:
+            try:
+                import pyarrow  # noqa: F401
+                os.makedirs(self.spill_dir, exist_ok=True)
+            except (ImportError, OSError):
+                self.spill_dir = None
+        self._entries = OrderedDict()  # key -> ParsedUpload (frames=None si está volcado)
+        self._refs = {}
+        self._spilled = {}  # key -> {hoja: (ruta, attrs)}
+        self._bytes = 0
+        self._lock = threading.RLock()  # release() puede llegar desde el recolector con el lock tomado
+
+    def acquire(self, key, compute):
+        """Handle del archivo 'key'; compute() lo parsea (ParsedUpload) solo si nadie lo tiene cargado"""
+        with self._lock:
+            known = key in self._entries
+        if not known:
+            parsed = compute()
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = parsed
+                    self._bytes += parsed.nbytes
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+            self._entries.move_to_end(key)
+            self._evict()
+        return UserDataHandle(self, key)
+
+    def release(self, key):
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 1) - 1
+            if self._refs[key] <= 0:
+                del self._refs[key]
+                if key in self._spilled:
+                    self._drop(key)  # volcado y sin sesiones: no vale la pena conservarlo
+            self._evict()
+
+    def frames(self, key):
+        """{hoja: DataFrame} del archivo, desde memoria o desde su volcado"""
+        with self._lock:
+            parsed = self._entries[key]
+            self._entries.move_to_end(key)
+            if parsed.frames is not None:
+                return parsed.frames
+            spilled = self._spilled[key]
+        return {sheet: _read_arrow(path, attrs) for sheet, (path, attrs) in spilled.items()}
+
+    def summary(self, key):
+        with self._lock:
+            return self._entries[key].summary()
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._entries), "spilled": len(self._spilled), "refs": sum(self._refs.values()),
+                    "mb": round(self._bytes / 2 ** 20, 2)}
+
+    def _resident(self):
+        return len(self._entries) - len(self._spilled)
+
+    def _drop(self, key):
+        parsed = self._entries.pop(key, None)
+        if parsed is None:
+            return
+        if key in self._spilled:
+            shutil.rmtree(os.path.join(self.spill_dir, key), ignore_errors=True)
+            del self._spilled[key]
+        else:
+            self._bytes -= parsed.nbytes
+
+    def _spill(self, key):
+        parsed = self._entries[key]
+        folder = os.path.join(self.spill_dir, key)
+        spilled = {}
+        try:
+            os.makedirs(folder, exist_ok=True)
+            for i, (sheet, df) in enumerate(parsed.frames.items()):
+                path = os.path.join(folder, f"{i}.arrow")
+                _write_arrow(df, path)
+                spilled[sheet] = (path, {**df.attrs, "index_name": df.index.name})
+        except (OSError, ValueError, TypeError):
+            shutil.rmtree(folder, ignore_errors=True)
+            return False
+        self._spilled[key] = spilled
+        parsed.frames = None
+        self._bytes -= parsed.nbytes
+        return True
+
+    def _evict(self):
+        """Con el lock tomado: descarta lo no referenciado (LRU) y, si hace falta, vuelca lo referenciado"""
+        def over():
+            return self._resident() > self.max_entries or self._bytes > self.max_bytes
+        for key in [k for k in self._entries if not self._refs.get(k)]:
+            if not over():
+                return
+            self._drop(key)
+        if self.spill_dir:
+            for key in [k for k in self._entries if k not in self._spilled]:
+                if not over():
+                    return
+                self._spill(key)